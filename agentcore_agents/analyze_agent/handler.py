@@ -3,6 +3,8 @@ from bedrock_agentcore import BedrockAgentCoreApp
 from agent import analyze_agent
 from log_sanitizer import sanitize_log
 from prompt_injection_detector import detect_prompt_injection, sanitize_input
+from tools import get_ec2_status
+from verdict import Verdict, verdict_from_status
 import asyncio
 
 app = BedrockAgentCoreApp()
@@ -35,9 +37,18 @@ def invoke(payload):
         # Run async invoke
         result = asyncio.run(analyze_agent.invoke_async(prompt))
         
+        # The verdict is derived from the instance's current state, not from the model's prose
+        try:
+            verdict = verdict_from_status(get_ec2_status(instance_id))
+        except Exception as e:
+            # Keep the completed agent result; an unknown verdict escalates rather than failing the stage
+            app.logger.warning(sanitize_log(f"Verdict derivation failed: {e}"))
+            verdict = Verdict('unknown', True, 0.3, 'escalate')
+        
         return {
             'agent': 'analyze',
             'incident_id': incident_id,
+            'verdict': verdict.to_dict(),
             'result': str(result)
         }
     except Exception as e:
@@ -11,17 +11,30 @@ from strands import tool
 # Set default AWS region for boto3
 os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
 
-# AWS EC2 tools
-@tool
-def get_ec2_instance_id(instance_name: str) -> str:
-    """Get EC2 instance ID from instance name"""
-    ec2 = boto3.client('ec2')
-    response = ec2.describe_instances(Filters=[{'Name': 'tag:Name', 'Values': [instance_name]}])
+# Name / private IP -> instance ID lookups, reused across invocations of a warm runtime
+INSTANCE_CACHE_TTL = int(os.environ.get('INSTANCE_CACHE_TTL', 300))
+_instance_ids = {}
+
+def _lookup_instance_id(filter_name: str, value: str) -> str:
+    """Resolve one filter value to an instance ID, caching hits and dropping misses"""
+    cached = _instance_ids.get((filter_name, value))
+    if cached and cached[1] > time.time():
+        return cached[0]
+    ec2 = boto3.client('ec2', region_name='us-east-1')
+    response = ec2.describe_instances(Filters=[{'Name': filter_name, 'Values': [value]}])
     for reservation in response['Reservations']:
         for instance in reservation['Instances']:
+            _instance_ids[(filter_name, value)] = (instance['InstanceId'], time.time() + INSTANCE_CACHE_TTL)
             return instance['InstanceId']
+    _instance_ids.pop((filter_name, value), None)
     return None
 
+# AWS EC2 tools
+@tool
+def get_ec2_instance_id(instance_name: str) -> str:
+    """Get EC2 instance ID from instance name"""
+    return _lookup_instance_id('tag:Name', instance_name)
+
 @tool
 def get_ec2_status(instance_id: str, region: str = 'us-east-1') -> Dict[str, str]:
     """Get EC2 instance status"""
@@ -92,15 +105,7 @@ def check_ssh_connectivity(host: str, port: int = 22, timeout: int = 5) -> Dict[
             instance_id = host
         else:
             # Try to find instance by private IP
-            ec2 = boto3.client('ec2', region_name='us-east-1')
-            response = ec2.describe_instances(
-                Filters=[{'Name': 'private-ip-address', 'Values': [host]}]
-            )
-            instance_id = None
-            for reservation in response['Reservations']:
-                for instance in reservation['Instances']:
-                    instance_id = instance['InstanceId']
-                    break
+            instance_id = _lookup_instance_id('private-ip-address', host)
             if not instance_id:
                 return {"host": host, "port": port, "accessible": False, "error": "Instance not found"}
         
@@ -3,6 +3,8 @@ from bedrock_agentcore import BedrockAgentCoreApp
 from agent import sop_execution_agent
 from log_sanitizer import sanitize_log
 from prompt_injection_detector import detect_prompt_injection, sanitize_input
+from tools import check_ssh_connectivity, get_ec2_status
+from verdict import Verdict, verdict_from_status
 import asyncio
 
 app = BedrockAgentCoreApp()
@@ -34,9 +36,18 @@ def invoke(payload):
         prompt = f"Execute remediation. Incident: {incident_id}, Instance: {instance_id}, IP: {server_ip}. SOP: {sop_result}. Start instance if stopped."
         result = asyncio.run(sop_execution_agent.invoke_async(prompt))
         
+        # The verdict is derived from the instance's current state, not from the model's prose
+        try:
+            verdict = verdict_from_status(get_ec2_status(instance_id), check_ssh_connectivity(instance_id))
+        except Exception as e:
+            # Keep the completed agent result; an unknown verdict escalates rather than failing the stage
+            app.logger.warning(sanitize_log(f"Verdict derivation failed: {e}"))
+            verdict = Verdict('unknown', True, 0.3, 'escalate')
+        
         return {
             'agent': 'sop_execution',
             'incident_id': incident_id,
+            'verdict': verdict.to_dict(),
             'result': str(result)
         }
     except Exception as e:
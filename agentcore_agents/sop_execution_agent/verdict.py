@@ -0,0 +1,60 @@
+"""Structured verdict exchanged between the agents and the orchestrator"""
+from dataclasses import dataclass, asdict
+
+STATES = ('pending', 'running', 'shutting-down', 'terminated', 'stopping', 'stopped', 'unknown')
+ACTIONS = ('none', 'start_instance', 'investigate_ssh', 'recover_instance', 'escalate')
+
+@dataclass(frozen=True)
+class Verdict:
+    """Instance state, whether the issue persists, confidence (0-1) and the recommended next action"""
+    state: str
+    persists: bool
+    confidence: float
+    recommended_action: str
+
+    def __post_init__(self):
+        if self.state not in STATES:
+            raise ValueError(f"Invalid verdict state: {self.state!r}")
+        if not isinstance(self.persists, bool):
+            raise ValueError(f"Invalid verdict persists: {self.persists!r}")
+        if isinstance(self.confidence, bool) or not isinstance(self.confidence, (int, float)) \
+                or not 0 <= self.confidence <= 1:
+            raise ValueError(f"Invalid verdict confidence: {self.confidence!r}")
+        if self.recommended_action not in ACTIONS:
+            raise ValueError(f"Invalid verdict recommended_action: {self.recommended_action!r}")
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Verdict':
+        """Build a verdict from untrusted input, raising ValueError if it does not match the schema"""
+        if not isinstance(data, dict):
+            raise ValueError("Verdict must be an object")
+        fields = ('state', 'persists', 'confidence', 'recommended_action')
+        missing = [field for field in fields if field not in data]
+        if missing:
+            raise ValueError(f"Verdict missing fields: {', '.join(missing)}")
+        return cls(**{field: data[field] for field in fields})
+
+def verdict_from_status(status: dict, ssh: dict = None) -> Verdict:
+    """Derive a verdict from get_ec2_status and (optionally) check_ssh_connectivity results.
+
+    Applies the validation rules: a stopped or stopping instance persists, and a
+    running instance persists unless SSH (via SSM) is reachable. Without an SSH
+    check, a running instance is reported with low confidence.
+    """
+    state = status.get('state', 'unknown')
+    if state not in STATES:
+        state = 'unknown'
+    if state in ('stopped', 'stopping'):
+        return Verdict(state, True, 1.0, 'start_instance')
+    if state in ('terminated', 'shutting-down'):
+        return Verdict(state, True, 1.0, 'recover_instance')
+    if state == 'running':
+        if ssh is None:
+            return Verdict(state, True, 0.5, 'investigate_ssh')
+        if ssh.get('accessible'):
+            return Verdict(state, False, 1.0, 'none')
+        return Verdict(state, True, 1.0 if 'ping_status' in ssh else 0.7, 'investigate_ssh')
+    return Verdict(state, True, 0.3, 'escalate')
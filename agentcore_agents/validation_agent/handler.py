@@ -3,6 +3,8 @@ from bedrock_agentcore import BedrockAgentCoreApp
 from agent import validation_agent
 from log_sanitizer import sanitize_log
 from prompt_injection_detector import detect_prompt_injection, sanitize_input
+from tools import check_ssh_connectivity, get_ec2_status
+from verdict import Verdict, verdict_from_status
 import asyncio
 
 app = BedrockAgentCoreApp()
@@ -34,13 +36,20 @@ def invoke(payload):
         prompt = f"Validate incident {incident_id}. Instance ID: {instance_id}, IP: {server_ip}. Check status and SSH. Analysis: {analysis_result}"
         result = asyncio.run(validation_agent.invoke_async(prompt))
         
-        issue_persists = 'persists' in str(result).lower() or 'stopped' in str(result).lower()
+        # The verdict is derived from the instance's current state, not from the model's prose
+        try:
+            verdict = verdict_from_status(get_ec2_status(instance_id), check_ssh_connectivity(instance_id))
+        except Exception as e:
+            # Keep the completed agent result; an unknown verdict escalates rather than failing the stage
+            app.logger.warning(sanitize_log(f"Verdict derivation failed: {e}"))
+            verdict = Verdict('unknown', True, 0.3, 'escalate')
         
         return {
             'agent': 'validation',
             'incident_id': incident_id,
-            'result': str(result),
-            'issue_persists': issue_persists
+            # Ahead of the prose so the orchestrator can stop reading once it sees a resolved verdict
+            'verdict': verdict.to_dict(),
+            'result': str(result)
         }
     except Exception as e:
         app.logger.error(sanitize_log(f"Agent error: {e}"))
@@ -0,0 +1,112 @@
+"""Per-incident pipeline checkpoints so retried invocations resume where they stopped"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+import boto3
+from botocore.config import Config
+
+class CheckpointStore(ABC):
+    """Stores the pipeline checkpoint of each incident, keyed by incident ID"""
+
+    @abstractmethod
+    def load(self, incident_id: str) -> dict:
+        ...
+
+    @abstractmethod
+    def save(self, incident_id: str, checkpoint: dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, incident_id: str) -> None:
+        ...
+
+class DynamoDBCheckpointStore(CheckpointStore):
+    """Checkpoint items in a DynamoDB table keyed by incident_id, expired through DynamoDB TTL"""
+
+    def __init__(self, table_name: str, region: str = 'us-east-1', ttl: int = 604800, client=None):
+        # Low-level client rather than a Table resource: clients are safe to share across batch threads.
+        # Pass a shared client when stores may be built off the main thread, since creating one is not.
+        self.client = client or boto3.client(
+            'dynamodb', region_name=region, config=Config(retries={'max_attempts': 3, 'mode': 'standard'})
+        )
+        self.table_name = table_name
+        self.ttl = ttl
+
+    def load(self, incident_id: str) -> dict:
+        item = self.client.get_item(
+            TableName=self.table_name, Key={'incident_id': {'S': incident_id}}, ConsistentRead=True
+        ).get('Item')
+        return json.loads(item['checkpoint']['S']) if item else None
+
+    def save(self, incident_id: str, checkpoint: dict) -> None:
+        self.client.put_item(TableName=self.table_name, Item={
+            'incident_id': {'S': incident_id},
+            'checkpoint': {'S': json.dumps(checkpoint)},
+            'expires_at': {'N': str(int(time.time()) + self.ttl)}
+        })
+
+    def delete(self, incident_id: str) -> None:
+        self.client.delete_item(TableName=self.table_name, Key={'incident_id': {'S': incident_id}})
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Checkpoints in a local SQLite database (local runs and testing)"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "incident_id TEXT PRIMARY KEY, checkpoint TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def load(self, incident_id: str) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT checkpoint FROM checkpoints WHERE incident_id = ?", (incident_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, incident_id: str, checkpoint: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (incident_id, checkpoint, updated_at) VALUES (?, ?, ?)",
+                (incident_id, json.dumps(checkpoint), time.time())
+            )
+
+    def delete(self, incident_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE incident_id = ?", (incident_id,))
+
+class FileCheckpointStore(CheckpointStore):
+    """One JSON file per incident in a local directory (local runs and testing)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self, incident_id: str) -> dict:
+        try:
+            with open(self._path(incident_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, incident_id: str, checkpoint: dict) -> None:
+        path = self._path(incident_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+
+    def delete(self, incident_id: str) -> None:
+        path = self._path(incident_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _path(self, incident_id: str) -> str:
+        return os.path.join(self.directory, f"{re.sub(r'[^A-Za-z0-9_-]', '_', incident_id)}.json")
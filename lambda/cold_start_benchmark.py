@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Cold-start profile of the Lambda orchestrator.
+
+Each run starts a fresh interpreter and times the phases a cold Lambda
+environment goes through: importing the orchestrator module, building each
+boto3 client on first use, and loading the security layer. No AWS calls are
+made.
+
+Example:
+    python3 cold_start_benchmark.py --runs 20 --layer-path ../security --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+LAMBDA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {lambda_dir!r})
+if {layer_path!r}:
+    sys.path.insert(0, {layer_path!r})
+timings = {{}}
+start = time.perf_counter()
+import lambda_orchestrator
+timings['import'] = time.perf_counter() - start
+for service in ('ec2', 'ssm', 'bedrock-agentcore'):
+    start = time.perf_counter()
+    try:
+        lambda_orchestrator.aws_client(service)
+    except Exception as e:
+        print(f"client {{service}} failed: {{e}}", file=sys.stderr)
+    timings[f'client_{{service}}'] = time.perf_counter() - start
+start = time.perf_counter()
+lambda_orchestrator.security_layer()
+timings['security_layer'] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+def run_once(layer_path: str, importtime: bool) -> tuple:
+    env = dict(os.environ)
+    env.setdefault('AWS_REGION', 'us-east-1')
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd += ['-c', PROBE.format(lambda_dir=LAMBDA_DIR, layer_path=layer_path or '')]
+    result = subprocess.run(cmd, capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def slowest_imports(stderr: str, limit: int = 15) -> list:
+    """Parse -X importtime output into (cumulative microseconds, module) pairs"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters to start')
+    parser.add_argument('--layer-path', default=None, help='directory holding the security layer modules')
+    parser.add_argument('--importtime', action='store_true', help='also list the slowest imports of the last run')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    layer_path = os.path.abspath(args.layer_path) if args.layer_path else None
+    samples = {}
+    stderr = ''
+    for _ in range(args.runs):
+        timings, stderr = run_once(layer_path, args.importtime)
+        for phase, seconds in timings.items():
+            samples.setdefault(phase, []).append(seconds * 1000)
+    samples['total'] = [sum(values) for values in zip(*samples.values())]
+
+    report = {
+        phase: {
+            'min_ms': round(min(values), 1),
+            'median_ms': round(statistics.median(values), 1),
+            'max_ms': round(max(values), 1)
+        }
+        for phase, values in samples.items()
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'phase':<26}{'min ms':>10}{'median ms':>12}{'max ms':>10}")
+        for phase, stats in report.items():
+            print(f"{phase:<26}{stats['min_ms']:>10}{stats['median_ms']:>12}{stats['max_ms']:>10}")
+    if args.importtime:
+        print("\nSlowest imports (cumulative, last run):")
+        for microseconds, module in slowest_imports(stderr):
+            print(f"{microseconds / 1000:>10.1f} ms  {module}")
+
+if __name__ == "__main__":
+    main()
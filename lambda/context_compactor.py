@@ -0,0 +1,145 @@
+"""Compact agent output into structured facts before it is forwarded to the next agent"""
+import json
+import re
+
+# No tokenizer ships with the Lambda, so tokens are estimated at ~4 characters each
+CHARS_PER_TOKEN = 4
+
+# Only 'state: X' and 'is X' count; a bare 'running' in an SOP step says nothing about the instance
+STATE_PATTERN = re.compile(
+    r'\b(?:state\W{0,3}|is\s+)(pending|running|shutting-down|terminated|stopping|stopped)\b', re.IGNORECASE
+)
+PERSISTS_PATTERN = re.compile(r'issue\s+(persists|resolved)', re.IGNORECASE)
+SECTION_PATTERN = re.compile(r'^\s*(?:\*\*|#+\s*)?([A-Za-z][A-Za-z /]+?):?(?:\*\*)?:?\s*$')
+STEP_PATTERN = re.compile(r'^\s*(?:\d+[.)]|[-*•])\s+(.+)$')
+ROOT_CAUSE_PATTERN = re.compile(r'[^.\n]*\b(?:root cause|caused by)\b[^.\n]*\.?', re.IGNORECASE)
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut text to the budget at a word boundary"""
+    limit = max(budget, 0) * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    if limit <= 3:
+        return ''
+    cut = text[:limit - 3]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip() + '...'
+
+def agent_prose(text: str) -> str:
+    """Unwrap the prose from an agent's JSON envelope; plain or partial text is returned as is"""
+    try:
+        data = json.loads(text)
+    except (ValueError, TypeError):
+        return text or ''
+    if isinstance(data, dict) and isinstance(data.get('result'), str):
+        return data['result']
+    return text
+
+def sections(prose: str) -> dict:
+    """Split '**Heading:**' style reports into lower-cased heading -> body"""
+    found = {}
+    heading = None
+    for line in prose.splitlines():
+        match = SECTION_PATTERN.match(line)
+        if match and (line.strip().startswith(('**', '#')) or line.strip().endswith(':')):
+            heading = match.group(1).strip().lower()
+            found[heading] = []
+        elif heading is not None:
+            found[heading].append(line)
+    return {heading: '\n'.join(lines).strip() for heading, lines in found.items()}
+
+def extract_facts(text: str, verdict: dict = None) -> dict:
+    """Pull instance state, whether the issue persists, root cause and SOP steps out of agent output.
+
+    The structured verdict wins over anything parsed from the prose.
+    """
+    prose = agent_prose(text)
+    facts = {'state': None, 'persists': None, 'root_cause': None, 'sop_steps': []}
+    if verdict:
+        facts['state'] = verdict.get('state')
+        facts['persists'] = verdict.get('persists')
+        facts['recommended_action'] = verdict.get('recommended_action')
+    if not facts['state']:
+        match = STATE_PATTERN.search(prose)
+        facts['state'] = match.group(1).lower() if match else None
+    if facts['persists'] is None:
+        match = PERSISTS_PATTERN.search(prose)
+        facts['persists'] = match.group(1).lower() == 'persists' if match else None
+
+    by_heading = sections(prose)
+    root_cause = next((body for heading, body in by_heading.items() if 'root cause' in heading and body), None)
+    if not root_cause:
+        match = ROOT_CAUSE_PATTERN.search(prose)
+        root_cause = match.group(0) if match else None
+    if root_cause:
+        facts['root_cause'] = ' '.join(root_cause.replace('**', '').split())
+
+    for line in prose.splitlines():
+        match = STEP_PATTERN.match(line)
+        if match:
+            facts['sop_steps'].append(match.group(1).replace('**', '').strip())
+    return facts
+
+def render_facts(facts: dict, budget: int, include: tuple, fallback: str = '') -> str:
+    """Render the facts named in include within the token budget.
+
+    The state line always comes first. When none of the included facts were
+    found, the start of the fallback prose fills the rest of the budget instead.
+    """
+    lines = []
+    if facts.get('state'):
+        line = f"Instance state: {facts['state'].upper()}"
+        if facts.get('persists') is not None:
+            line += '. Issue persists' if facts['persists'] else '. Issue resolved'
+        if facts.get('recommended_action'):
+            line += f" (recommended action: {facts['recommended_action']})"
+        lines.append(line + '.')
+    remaining = budget - estimate_tokens('\n'.join(lines))
+
+    found = [name for name in include if facts.get(name)]
+    if not found:
+        if fallback and remaining > 0:
+            lines.append(truncate_to_tokens(' '.join(fallback.split()), remaining - 1))
+        return '\n'.join(lines)
+
+    if 'root_cause' in found and remaining > 0:
+        line = truncate_to_tokens(f"Root cause: {facts['root_cause']}", remaining - 1)
+        lines.append(line)
+        remaining -= estimate_tokens(line) + 1
+    if 'sop_steps' in found and remaining > 0:
+        steps = facts['sop_steps']
+        lines.append('SOP steps:')
+        remaining -= estimate_tokens('SOP steps:') + 1
+        for number, step in enumerate(steps, 1):
+            line = f"{number}. {step}"
+            if estimate_tokens(line) + 1 > remaining:
+                omitted = f"({len(steps) - number + 1} more steps omitted)"
+                if estimate_tokens(omitted) <= remaining:
+                    lines.append(omitted)
+                break
+            lines.append(line)
+            remaining -= estimate_tokens(line) + 1
+    return '\n'.join(line for line in lines if line)
+
+def compact_fields(fields: dict, budget: int, enabled: bool = True):
+    """Compact each payload field and split the payload's token budget between them.
+
+    fields maps payload field -> (agent output, verdict or None, facts to keep).
+    Returns (compacted fields, {'before', 'after', 'budget'} token counts).
+    """
+    compacted = {}
+    before = after = 0
+    share = budget // max(len(fields), 1)
+    for name, (text, verdict, include) in fields.items():
+        text = text or ''
+        before += estimate_tokens(text)
+        if enabled:
+            prose = agent_prose(text)
+            text = render_facts(extract_facts(text, verdict), share, include, fallback=prose)
+        compacted[name] = text
+        after += estimate_tokens(text)
+    return compacted, {'before': before, 'after': after, 'budget': budget}
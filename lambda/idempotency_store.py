@@ -0,0 +1,135 @@
+"""Conditional-write claims so duplicate incident deliveries never start a second pipeline"""
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+import boto3
+from botocore.config import Config
+
+IN_PROGRESS = 'IN_PROGRESS'
+COMPLETED = 'COMPLETED'
+
+class IdempotencyStore(ABC):
+    """Tracks in-progress and completed incident runs by idempotency key"""
+
+    @abstractmethod
+    def claim(self, key: str, ttl: int) -> dict:
+        """Claim the key for a new run.
+
+        Returns None when the caller now owns the run, otherwise the existing
+        record ({'status', 'response'}). An in-progress claim older than ttl
+        seconds is treated as abandoned and taken over.
+        """
+
+    @abstractmethod
+    def complete(self, key: str, response: dict, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        """Drop an in-progress claim so a retry can run"""
+
+class DynamoDBIdempotencyStore(IdempotencyStore):
+    """Claims as conditional puts on a DynamoDB table keyed by idempotency_key"""
+
+    def __init__(self, table_name: str, region: str = 'us-east-1', client=None):
+        self.client = client or boto3.client(
+            'dynamodb', region_name=region, config=Config(retries={'max_attempts': 3, 'mode': 'standard'})
+        )
+        self.table_name = table_name
+
+    def claim(self, key: str, ttl: int) -> dict:
+        now = int(time.time())
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    'idempotency_key': {'S': key},
+                    'status': {'S': IN_PROGRESS},
+                    'expires_at': {'N': str(now + ttl)}
+                },
+                ConditionExpression='attribute_not_exists(idempotency_key) OR expires_at < :now',
+                ExpressionAttributeValues={':now': {'N': str(now)}},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            return None
+        except self.client.exceptions.ConditionalCheckFailedException as e:
+            item = e.response.get('Item') or self.client.get_item(
+                TableName=self.table_name, Key={'idempotency_key': {'S': key}}, ConsistentRead=True
+            ).get('Item')
+        if not item:
+            # Released between the failed put and the read; report it as in progress rather than race
+            return {'status': IN_PROGRESS, 'response': None}
+        return {
+            'status': item['status']['S'],
+            'response': json.loads(item['response']['S']) if 'response' in item else None
+        }
+
+    def complete(self, key: str, response: dict, ttl: int) -> None:
+        self.client.put_item(TableName=self.table_name, Item={
+            'idempotency_key': {'S': key},
+            'status': {'S': COMPLETED},
+            'response': {'S': json.dumps(response)},
+            'expires_at': {'N': str(int(time.time()) + ttl)}
+        })
+
+    def release(self, key: str) -> None:
+        try:
+            self.client.delete_item(
+                TableName=self.table_name,
+                Key={'idempotency_key': {'S': key}},
+                ConditionExpression='#status = :in_progress',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':in_progress': {'S': IN_PROGRESS}}
+            )
+        except self.client.exceptions.ConditionalCheckFailedException:
+            pass
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """Claims in a local SQLite database, serialized with BEGIN IMMEDIATE (local runs and testing)"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            "idempotency_key TEXT PRIMARY KEY, status TEXT NOT NULL, response TEXT, expires_at REAL NOT NULL)"
+        )
+
+    def claim(self, key: str, ttl: int) -> dict:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT status, response, expires_at FROM idempotency WHERE idempotency_key = ?", (key,)
+                ).fetchone()
+                if row and row[2] >= now:
+                    self._conn.execute("ROLLBACK")
+                    return {'status': row[0], 'response': json.loads(row[1]) if row[1] else None}
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO idempotency (idempotency_key, status, response, expires_at) "
+                    "VALUES (?, ?, NULL, ?)",
+                    (key, IN_PROGRESS, now + ttl)
+                )
+                self._conn.execute("COMMIT")
+                return None
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def complete(self, key: str, response: dict, ttl: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotency (idempotency_key, status, response, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, COMPLETED, json.dumps(response), time.time() + ttl)
+            )
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM idempotency WHERE idempotency_key = ? AND status = ?", (key, IN_PROGRESS)
+            )
@@ -0,0 +1,75 @@
+"""Cached EC2 instance ID resolution by Name tag"""
+import threading
+import time
+
+# EC2 accepts at most 200 values per filter
+FILTER_VALUE_LIMIT = 200
+RESOLVABLE_STATES = ['pending', 'running', 'shutting-down', 'stopping', 'stopped']
+
+class InstanceResolver:
+    """Maps server names to instance IDs with a TTL.
+
+    Kept at module scope so the cache survives warm invocations. Misses are
+    resolved with one filtered describe_instances call per 200 names, and
+    entries are dropped when a lookup or API call reports the instance gone.
+    """
+
+    def __init__(self, ec2_client, ttl: int = 300):
+        self.ec2_client = ec2_client
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_name = {}
+
+    def resolve(self, server_name: str) -> str:
+        return self.resolve_many([server_name]).get(server_name)
+
+    def resolve_many(self, server_names) -> dict:
+        """Return name -> instance ID for every name that resolves"""
+        now = time.time()
+        resolved = {}
+        misses = []
+        with self._lock:
+            for name in set(server_names):
+                cached = self._by_name.get(name)
+                if cached and cached[1] > now:
+                    resolved[name] = cached[0]
+                else:
+                    misses.append(name)
+
+        for i in range(0, len(misses), FILTER_VALUE_LIMIT):
+            batch = misses[i:i + FILTER_VALUE_LIMIT]
+            for name, instance_id in self._describe('tag:Name', batch):
+                resolved.setdefault(name, instance_id)
+            with self._lock:
+                for name in batch:
+                    if name not in resolved:
+                        self._by_name.pop(name, None)
+        return resolved
+
+    def forget(self, instance_id: str) -> None:
+        """Drop every cached mapping to an instance that no longer exists"""
+        with self._lock:
+            for name in [name for name, (cached_id, _) in self._by_name.items() if cached_id == instance_id]:
+                del self._by_name[name]
+
+    def _describe(self, filter_name: str, values: list) -> list:
+        """Run one filtered lookup, cache every match and return (name, id) tuples"""
+        filters = [
+            {'Name': filter_name, 'Values': values},
+            {'Name': 'instance-state-name', 'Values': RESOLVABLE_STATES}
+        ]
+        matches = []
+        paginator = self.ec2_client.get_paginator('describe_instances')
+        for page in paginator.paginate(Filters=filters):
+            for reservation in page['Reservations']:
+                for instance in reservation['Instances']:
+                    name = next((tag['Value'] for tag in instance.get('Tags', []) if tag['Key'] == 'Name'), None)
+                    matches.append((name, instance['InstanceId']))
+
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for name, instance_id in reversed(matches):
+                # Reversed so the first match wins, as with the original single-name lookup
+                if name:
+                    self._by_name[name] = (instance_id, expires_at)
+        return matches
@@ -1,20 +1,46 @@
 """Lambda Orchestrator for AgentCore Agents"""
 import json
 import os
+import re
 import sys
+import codecs
+import functools
+import threading
 import boto3
-from typing import Dict, Any
-
-sys.path.insert(0, '/opt/python')
-try:
-    from prompt_injection_detector import detect_prompt_injection
-    from log_sanitizer import sanitize_log
-    from pii_detector import detect_pii, redact_pii
-except ImportError:
-    def detect_prompt_injection(text): return False, ""
-    def sanitize_log(msg): return msg
-    def detect_pii(text): return {}
-    def redact_pii(text): return text
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, Any, Callable, Iterator, List
+from context_compactor import compact_fields
+from instance_resolver import InstanceResolver
+from pipeline_metrics import IncidentTimer, result_bytes
+from verdict import Verdict, verdict_from_status
+
+@functools.lru_cache(maxsize=None)
+def security_layer() -> SimpleNamespace:
+    """Import the security layer from /opt/python on first use, falling back to no-ops"""
+    if '/opt/python' not in sys.path:
+        sys.path.insert(0, '/opt/python')
+    try:
+        from prompt_injection_detector import detect_prompt_injection
+        from log_sanitizer import sanitize_log
+        from pii_detector import detect_pii, redact_pii
+    except ImportError:
+        def detect_prompt_injection(text): return False, ""
+        def sanitize_log(msg): return msg
+        def detect_pii(text): return {}
+        def redact_pii(text): return text
+    return SimpleNamespace(
+        detect_prompt_injection=detect_prompt_injection,
+        sanitize_log=sanitize_log,
+        detect_pii=detect_pii,
+        redact_pii=redact_pii
+    )
+
+def detect_prompt_injection(text): return security_layer().detect_prompt_injection(text)
+def sanitize_log(msg): return security_layer().sanitize_log(msg)
+def detect_pii(text): return security_layer().detect_pii(text)
+def redact_pii(text): return security_layer().redact_pii(text)
 
 # AgentCore ARNs from environment variables
 ANALYZE_AGENT_ARN = os.environ.get('ANALYZE_AGENT_ARN')
@@ -22,156 +48,536 @@ VALIDATION_AGENT_ARN = os.environ.get('VALIDATION_AGENT_ARN')
 SOP_AGENT_ARN = os.environ.get('SOP_AGENT_ARN')
 EXECUTION_AGENT_ARN = os.environ.get('EXECUTION_AGENT_ARN')
 
-# Initialize clients
-agentcore_client = boto3.client('bedrock-agentcore', region_name='us-east-1')
-ec2_client = boto3.client('ec2', region_name='us-east-1')
+# Resolve unambiguous incidents from EC2 and SSM state without invoking agents
+FAST_PATH_TRIAGE = os.environ.get('FAST_PATH_TRIAGE', 'true').lower() == 'true'
+
+# Agent handlers emit their verdict ahead of the prose; a resolved validation verdict ends the read early.
+# The agent's model run is already complete by then, so this saves stream transfer, not model time.
+RESOLVED_MARKER = re.compile(r'"verdict"\s*:\s*(\{[^{}]*"persists"\s*:\s*false[^{}]*\})')
+MARKER_WINDOW = 256
+
+# Agent output is reduced to structured facts (state, root cause, SOP steps) before it is
+# forwarded, within an estimated token budget per downstream payload
+CONTEXT_COMPACTION = os.environ.get('CONTEXT_COMPACTION', 'true').lower() == 'true'
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', 500))
+
+# Pipeline checkpoints: none, dynamodb, or sqlite/file for local runs
+PIPELINE_STORE = os.environ.get('PIPELINE_STORE', 'none')
+PIPELINE_TABLE = os.environ.get('PIPELINE_TABLE', 'incident-pipeline-checkpoints')
+PIPELINE_STORE_PATH = os.environ.get('PIPELINE_STORE_PATH', '/tmp/incident_checkpoints')
+PIPELINE_CHECKPOINT_TTL = int(os.environ.get('PIPELINE_CHECKPOINT_TTL', 604800))
+
+# Duplicate deliveries: none, dynamodb, or sqlite for local runs. An in-progress claim outlives
+# the 180s Lambda timeout so a crashed run is taken over; completed results are replayed for a day.
+IDEMPOTENCY_STORE = os.environ.get('IDEMPOTENCY_STORE', 'none')
+IDEMPOTENCY_TABLE = os.environ.get('IDEMPOTENCY_TABLE', 'incident-idempotency')
+IDEMPOTENCY_STORE_PATH = os.environ.get('IDEMPOTENCY_STORE_PATH', '/tmp/incident_idempotency.db')
+IDEMPOTENCY_IN_PROGRESS_TTL = int(os.environ.get('IDEMPOTENCY_IN_PROGRESS_TTL', 200))
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+
+# Batch mode: incidents per request, pipelines run in parallel, concurrent calls per agent ARN.
+# The defaults keep a full batch to one wave of agent chains, so it needs no more time than a
+# single incident; larger batches need a longer Lambda timeout (see README).
+BATCH_MAX_INCIDENTS = int(os.environ.get('BATCH_MAX_INCIDENTS', 4))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+AGENT_CONCURRENCY = int(os.environ.get('AGENT_CONCURRENCY', 4))
+
+INSTANCE_ID_PATTERN = re.compile(r'^i-[0-9a-f]{8,17}$')
+
+# Seconds a resolved server name or IP -> instance ID mapping is reused across warm invocations
+INSTANCE_CACHE_TTL = int(os.environ.get('INSTANCE_CACHE_TTL', 300))
+
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Agent runs stream for minutes, so their read timeout sits just under the 180s Lambda timeout
+AGENT_READ_TIMEOUT = int(os.environ.get('AGENT_READ_TIMEOUT', 170))
+
+# Clients are built on first use; a fast-path incident never pays for the AgentCore client
+clients = {}
+clients_lock = threading.Lock()
+
+agent_slots = {}
+agent_slots_lock = threading.Lock()
+
+# Resolver and stores are first requested from batch worker threads, so they are built under a lock
+shared = {}
+shared_lock = threading.Lock()
+
+def aws_client(service: str):
+    """Return the shared boto3 client for a service, creating it on first use"""
+    with clients_lock:
+        if service not in clients:
+            config = Config(
+                retries={'max_attempts': 3, 'mode': 'adaptive'},
+                max_pool_connections=max(BATCH_MAX_WORKERS, AGENT_CONCURRENCY) * 2,
+                tcp_keepalive=True,
+                read_timeout=AGENT_READ_TIMEOUT if service == 'bedrock-agentcore' else 60
+            )
+            clients[service] = boto3.client(service, region_name=AWS_REGION, config=config)
+        return clients[service]
+
+def shared_instance(name: str, build: Callable[[], Any]):
+    """Return the shared object built by build(), creating it once across threads"""
+    with shared_lock:
+        if name not in shared:
+            shared[name] = build()
+        return shared[name]
+
+def get_instance_resolver() -> InstanceResolver:
+    return shared_instance('instance_resolver', lambda: InstanceResolver(aws_client('ec2'), ttl=INSTANCE_CACHE_TTL))
+
+def get_checkpoint_store():
+    """Return the configured checkpoint store, or None when checkpointing is off"""
+    return shared_instance('checkpoint_store', build_checkpoint_store)
+
+def build_checkpoint_store():
+    if PIPELINE_STORE == 'none':
+        return None
+    from checkpoint_store import DynamoDBCheckpointStore, FileCheckpointStore, SQLiteCheckpointStore
+    if PIPELINE_STORE == 'dynamodb':
+        return DynamoDBCheckpointStore(PIPELINE_TABLE, ttl=PIPELINE_CHECKPOINT_TTL, client=aws_client('dynamodb'))
+    if PIPELINE_STORE == 'sqlite':
+        return SQLiteCheckpointStore(f"{PIPELINE_STORE_PATH}.db")
+    if PIPELINE_STORE == 'file':
+        return FileCheckpointStore(PIPELINE_STORE_PATH)
+    raise ValueError(f"Unknown PIPELINE_STORE: {PIPELINE_STORE}")
+
+def get_idempotency_store():
+    """Return the configured idempotency store, or None when duplicate detection is off"""
+    return shared_instance('idempotency_store', build_idempotency_store)
+
+def build_idempotency_store():
+    if IDEMPOTENCY_STORE == 'none':
+        return None
+    from idempotency_store import DynamoDBIdempotencyStore, SQLiteIdempotencyStore
+    if IDEMPOTENCY_STORE == 'dynamodb':
+        return DynamoDBIdempotencyStore(IDEMPOTENCY_TABLE, client=aws_client('dynamodb'))
+    if IDEMPOTENCY_STORE == 'sqlite':
+        return SQLiteIdempotencyStore(IDEMPOTENCY_STORE_PATH)
+    raise ValueError(f"Unknown IDEMPOTENCY_STORE: {IDEMPOTENCY_STORE}")
 
 def get_ec2_instance_id(server_name: str) -> str:
     """Get EC2 instance ID from server name"""
-    response = ec2_client.describe_instances(Filters=[{'Name': 'tag:Name', 'Values': [server_name]}])
-    for reservation in response['Reservations']:
-        for instance in reservation['Instances']:
-            return instance['InstanceId']
-    return None
-
-def invoke_agentcore_agent(agent_arn: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Invoke AgentCore agent via ARN"""
+    return get_instance_resolver().resolve(server_name)
+
+def triage_instance(instance_id: str) -> Dict[str, Any]:
+    """Classify an incident from EC2 status checks and SSM ping status.
+
+    A verdict is only given when the state is unambiguous: a stopped instance,
+    or a running one with passing status checks and an online SSM agent (the
+    Validation agent's own criterion). Otherwise the verdict is None.
+    """
+    triage = {
+        'instance_id': instance_id,
+        'state': 'unknown',
+        'system_status': 'N/A',
+        'instance_status': 'N/A',
+        'ping_status': 'N/A',
+        'verdict': None
+    }
     try:
-        response = agentcore_client.invoke_agent_runtime(
-            agentRuntimeArn=agent_arn,
-            payload=json.dumps(payload).encode('utf-8'),
-            contentType='application/json',
-            accept='application/json'
-        )
-        
-        # Read streaming response
-        result = ""
-        if 'completion' in response:
-            for event in response['completion']:
-                if 'chunk' in event:
-                    chunk = event['chunk']
-                    if 'bytes' in chunk:
-                        result += chunk['bytes'].decode('utf-8')
-        
-        print(f"Agent response length: {len(result)} chars")
-        return {'result': result, 'success': True}
+        response = aws_client('ec2').describe_instance_status(InstanceIds=[instance_id], IncludeAllInstances=True)
+        if response['InstanceStatuses']:
+            status = response['InstanceStatuses'][0]
+            triage['state'] = status['InstanceState']['Name']
+            triage['system_status'] = status.get('SystemStatus', {}).get('Status', 'N/A')
+            triage['instance_status'] = status.get('InstanceStatus', {}).get('Status', 'N/A')
+        if triage['state'] == 'running':
+            response = aws_client('ssm').describe_instance_information(
+                Filters=[{'Key': 'InstanceIds', 'Values': [instance_id]}]
+            )
+            if response['InstanceInformationList']:
+                triage['ping_status'] = response['InstanceInformationList'][0].get('PingStatus', 'Unknown')
+    except Exception as e:
+        print(f"Triage failed for {instance_id}: {str(e)}")
+        if 'InvalidInstanceID' in str(e):
+            get_instance_resolver().forget(instance_id)
+        return triage
+
+    if triage['state'] == 'stopped' or (
+            triage['state'] == 'running' and triage['system_status'] == 'ok'
+            and triage['instance_status'] == 'ok' and triage['ping_status'] == 'Online'):
+        ssh = {'accessible': triage['ping_status'] == 'Online', 'ping_status': triage['ping_status']}
+        triage['verdict'] = verdict_from_status(triage, ssh).to_dict()
+    return triage
+
+def describe_triage(triage: Dict[str, Any]) -> str:
+    """Render triage facts in the shape of the Analyze and Validation agent reports"""
+    summary = (
+        f"**Instance Status Check Results:**\n"
+        f"Instance {triage['instance_id']} state: {triage['state']}, "
+        f"system status: {triage['system_status']}, instance status: {triage['instance_status']}, "
+        f"SSM ping status: {triage['ping_status']}"
+    )
+    if triage['verdict'] and triage['verdict']['persists']:
+        summary += "\n\nInstance is STOPPED. Issue persists."
+    elif triage['verdict']:
+        summary += "\n\nInstance is RUNNING and its SSM agent is online. SSH has not been verified."
+    return summary
+
+def iter_agent_chunks(response: Dict[str, Any]) -> Iterator[str]:
+    """Yield decoded text from a streamed agent completion as chunks arrive"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for event in response.get('completion', []):
+        if 'chunk' in event and 'bytes' in event['chunk']:
+            text = decoder.decode(event['chunk']['bytes'])
+            if text:
+                yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+def agent_slot(agent_arn: str) -> threading.BoundedSemaphore:
+    """Return the semaphore bounding concurrent invocations of one agent"""
+    with agent_slots_lock:
+        if agent_arn not in agent_slots:
+            agent_slots[agent_arn] = threading.BoundedSemaphore(AGENT_CONCURRENCY)
+        return agent_slots[agent_arn]
+
+def invoke_agentcore_agent(agent_arn: str, payload: Dict[str, Any],
+                           on_chunk: Callable[[str], None] = None, stop_marker: re.Pattern = None) -> Dict[str, Any]:
+    """Invoke AgentCore agent via ARN.
+
+    Chunks are passed to on_chunk as they arrive. If stop_marker matches the
+    streamed text, reading stops there and the matched text is returned as
+    'marker' alongside the partial result.
+    """
+    try:
+        with agent_slot(agent_arn):
+            return read_agent_response(agent_arn, payload, on_chunk, stop_marker)
     except Exception as e:
         print(f"Error invoking agent {agent_arn}: {str(e)}")
         return {'error': str(e), 'success': False}
 
-def lambda_handler(event, context):
-    """Main orchestrator for incident processing"""
+def read_agent_response(agent_arn: str, payload: Dict[str, Any],
+                        on_chunk: Callable[[str], None], stop_marker: re.Pattern) -> Dict[str, Any]:
+    response = aws_client('bedrock-agentcore').invoke_agent_runtime(
+        agentRuntimeArn=agent_arn,
+        payload=json.dumps(payload).encode('utf-8'),
+        contentType='application/json',
+        accept='application/json'
+    )
+    
+    # Read streaming response
+    parts = []
+    tail = ""
+    marker = None
+    for text in iter_agent_chunks(response):
+        parts.append(text)
+        if on_chunk:
+            on_chunk(text)
+        if stop_marker:
+            # Search the end of the previous chunk too, so a marker split across chunks is found
+            window = tail + text
+            match = stop_marker.search(window)
+            if match:
+                marker = match.group(match.lastindex or 0)
+                break
+            tail = window[-MARKER_WINDOW:]
+    if marker and hasattr(response.get('completion'), 'close'):
+        response['completion'].close()
+    result = "".join(parts)
+    
+    print(f"Agent response length: {len(result)} chars")
+    if marker:
+        print(f"Stopped reading at verdict marker: {marker}")
+        return {'result': result, 'success': True, 'marker': marker}
+    return {'result': result, 'success': True}
+
+def agent_verdict(agent_result: Dict[str, Any]) -> Verdict:
+    """Extract and validate the verdict from an agent response, or None if it has none"""
     try:
-        # Parse incoming event - handle both API Gateway and direct invocation
-        if 'body' in event and isinstance(event['body'], str):
-            body = json.loads(event['body'])
-        else:
-            body = event
-        
-        incident_id = body.get('incident_id')
-        server_name = body.get('server_name')
-        server_ip = body.get('server_ip')
-        description = body.get('description', '')
-        
-        # Detect and redact PII
+        if 'marker' in agent_result:
+            return Verdict.from_dict(json.loads(agent_result['marker']))
+        return Verdict.from_dict(json.loads(agent_result.get('result', '')).get('verdict'))
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"No valid verdict in agent response: {str(e)}")
+        return None
+
+def stage_context(fields: Dict[str, tuple]):
+    """Compact the upstream results a stage forwards, logging the token counts before and after"""
+    context, tokens = compact_fields(fields, CONTEXT_TOKEN_BUDGET, enabled=CONTEXT_COMPACTION)
+    print(f"Context tokens: {tokens['before']} -> {tokens['after']} (budget {tokens['budget']})")
+    return context, tokens
+
+def run_triage(incident: Dict[str, Any], results: Dict[str, Any]):
+    if not FAST_PATH_TRIAGE:
+        return {'verdict': None}, 'analyze'
+    triage = triage_instance(incident['instance_id'])
+    print(sanitize_log(f"Triage: {triage}"))
+    verdict = Verdict.from_dict(triage['verdict']) if triage['verdict'] else None
+    if verdict and not verdict.persists:
+        # SSM reachability does not prove sshd is up, so Validation confirms SSH before anything is closed
+        print("Instance looks healthy (fast-path triage), validating SSH")
+        return triage, 'validate'
+    if verdict and verdict.recommended_action == 'start_instance':
+        # State is unambiguous, so skip analysis and validation and go straight to the SOP
+        return triage, 'sop'
+    return triage, 'analyze'
+
+def run_analyze(incident: Dict[str, Any], results: Dict[str, Any]):
+    print(sanitize_log("Invoking Analyze Agent..."))
+    analyze_payload = {
+        'incident_id': incident['incident_id'],
+        'instance_id': incident['instance_id'],
+        'server_name': incident['server_name']
+    }
+    analyze_result = invoke_agentcore_agent(ANALYZE_AGENT_ARN, analyze_payload)
+    print(f"Analyze result: {analyze_result}")
+    verdict = agent_verdict(analyze_result) if analyze_result['success'] else None
+    analyze_result['verdict'] = verdict.to_dict() if verdict else None
+    return analyze_result, 'validate'
+
+def run_validate(incident: Dict[str, Any], results: Dict[str, Any]):
+    print("Invoking Validation Agent...")
+    triage = results.get('triage', {})
+    triage_text = describe_triage(triage) if 'state' in triage else ''
+    analyze = results.get('analyze', {})
+    # Without Analyze, Validation gets the triage prose only; the triage verdict would read as 'Issue resolved'
+    context, tokens = stage_context({
+        'analysis_result': (analyze.get('result', triage_text), analyze.get('verdict'), ('root_cause',))
+    })
+    validation_payload = {
+        'incident_id': incident['incident_id'],
+        'instance_id': incident['instance_id'],
+        'server_ip': incident['server_ip'],
+        **context
+    }
+    validation_result = invoke_agentcore_agent(VALIDATION_AGENT_ARN, validation_payload, stop_marker=RESOLVED_MARKER)
+    print(f"Validation result: {validation_result}")
+    validation_result['context_tokens'] = tokens
+    
+    if not validation_result['success']:
+        return validation_result, 'validate'
+    
+    # Route only on the structured verdict; a response without one is a failed validation
+    verdict = agent_verdict(validation_result)
+    if not verdict:
+        return {
+            'success': False,
+            'error': 'Validation agent returned no valid verdict',
+            'context_tokens': tokens
+        }, 'validate'
+    validation_result['verdict'] = verdict.to_dict()
+    print(f"Validation verdict: {verdict}")
+    if verdict.persists:
+        return validation_result, 'sop'
+    print("Issue already resolved")
+    return validation_result, 'resolved'
+
+def run_sop(incident: Dict[str, Any], results: Dict[str, Any]):
+    print("Invoking SOP Agent...")
+    triage = results.get('triage', {})
+    triage_text = describe_triage(triage) if 'state' in triage else ''
+    analyze = results.get('analyze', {})
+    validate = results.get('validate', {})
+    context, tokens = stage_context({
+        'analysis_result': (
+            analyze.get('result', triage_text), analyze.get('verdict', triage.get('verdict')), ('root_cause',)
+        ),
+        'validation_result': (
+            validate.get('result', triage_text), validate.get('verdict', triage.get('verdict')), ('root_cause',)
+        )
+    })
+    sop_payload = {
+        'incident_id': incident['incident_id'],
+        'instance_id': incident['instance_id'],
+        **context
+    }
+    sop_result = invoke_agentcore_agent(SOP_AGENT_ARN, sop_payload)
+    print(f"SOP result: {sop_result}")
+    sop_result['context_tokens'] = tokens
+    verdict = agent_verdict(sop_result) if sop_result['success'] else None
+    sop_result['verdict'] = verdict.to_dict() if verdict else None
+    return sop_result, 'execute'
+
+def run_execute(incident: Dict[str, Any], results: Dict[str, Any]):
+    print("Invoking Execution Agent...")
+    sop = results['sop']
+    context, tokens = stage_context({'sop_result': (sop.get('result', ''), sop.get('verdict'), ('sop_steps',))})
+    execution_payload = {
+        'incident_id': incident['incident_id'],
+        'instance_id': incident['instance_id'],
+        'server_ip': incident['server_ip'],
+        **context
+    }
+    execution_result = invoke_agentcore_agent(EXECUTION_AGENT_ARN, execution_payload)
+    print(f"Execution result: {execution_result}")
+    execution_result['context_tokens'] = tokens
+    if not execution_result['success']:
+        return execution_result, 'execute'
+    
+    # Only a verdict confirming recovery counts as remediated; anything else is left to on-call
+    verdict = agent_verdict(execution_result)
+    execution_result['verdict'] = verdict.to_dict() if verdict else None
+    if verdict and not verdict.persists:
+        return execution_result, 'remediated'
+    return execution_result, 'escalated'
+
+# Stage name -> (label, runner). Runners return (result, next stage); 'resolved', 'remediated'
+# and 'escalated' are terminal.
+PIPELINE_STAGES = {
+    'triage': ('Triage', run_triage),
+    'analyze': ('Analyze', run_analyze),
+    'validate': ('Validation', run_validate),
+    'sop': ('SOP', run_sop),
+    'execute': ('Execution', run_execute)
+}
+
+def run_pipeline(incident: Dict[str, Any], store=None, timer: IncidentTimer = None) -> Dict[str, Any]:
+    """Run the incident pipeline, checkpointing after every stage.
+
+    With a store, a retried or redelivered incident resumes at its first
+    incomplete stage, and a finished incident returns its recorded outcome.
+    Each stage is timed, and the response body carries the timing summary.
+    """
+    incident_id = incident['incident_id']
+    timer = timer or IncidentTimer(incident_id)
+    checkpoint = store.load(incident_id) if store else None
+    if checkpoint and checkpoint.get('instance_id') == incident['instance_id']:
+        stage, results = checkpoint['stage'], checkpoint['results']
+        print(sanitize_log(f"Resuming incident {incident_id} at stage {stage}"))
+    else:
+        stage, results = 'triage', {}
+
+    while stage in PIPELINE_STAGES:
+        label, run = PIPELINE_STAGES[stage]
+        with timer.stage(stage) as timing:
+            result, next_stage = run(incident, results)
+            timing['response_bytes'] = result_bytes(result)
+            timing['success'] = result.get('success', True)
+            if 'context_tokens' in result:
+                timing['metrics'] = {
+                    'ContextTokensBefore': result['context_tokens']['before'],
+                    'ContextTokensAfter': result['context_tokens']['after']
+                }
+        if not result.get('success', True):
+            return {'statusCode': 500, 'body': json.dumps({
+                'error': f'{label} agent failed',
+                'details': result,
+                'timings': timer.finish(stage, False)
+            })}
+        results[stage] = result
+        stage = next_stage
+        if store:
+            store.save(incident_id, {'instance_id': incident['instance_id'], 'stage': stage, 'results': results})
+
+    body = {
+        'incident_id': incident_id,
+        'status': stage,
+        'instance_id': incident['instance_id']
+    }
+    verdicts = [result['verdict'] for result in results.values() if result.get('verdict')]
+    if verdicts:
+        body['verdict'] = verdicts[-1]
+    triage = results.get('triage', {})
+    if triage.get('verdict'):
+        body['triage'] = describe_triage(triage)
+    body['timings'] = timer.finish(stage, True)
+    return {'statusCode': 200, 'body': json.dumps(body)}
+
+def run_idempotent(incident: Dict[str, Any], timer: IncidentTimer = None) -> Dict[str, Any]:
+    """Run the pipeline unless the same incident and instance is already running or done.
+
+    A duplicate delivery gets 202 while the first run is in progress, and the
+    recorded response once it has completed. Failed runs release their claim
+    so a retry can resume from the checkpoint.
+    """
+    incident_id = incident['incident_id']
+    checkpoints = get_checkpoint_store() if incident_id else None
+    store = get_idempotency_store() if incident_id else None
+    if not store:
+        return run_pipeline(incident, checkpoints, timer)
+
+    key = f"{incident_id}#{incident['instance_id']}"
+    record = store.claim(key, IDEMPOTENCY_IN_PROGRESS_TTL)
+    if record:
+        print(sanitize_log(f"Duplicate delivery of incident {incident_id} ({record['status']})"))
+        if record['response']:
+            return record['response']
+        return {
+            'statusCode': 202,
+            'body': json.dumps({
+                'incident_id': incident_id,
+                'status': 'in_progress',
+                'instance_id': incident['instance_id']
+            })
+        }
+
+    try:
+        response = run_pipeline(incident, checkpoints, timer)
+    except Exception:
+        store.release(key)
+        raise
+    if response['statusCode'] == 200:
+        store.complete(key, response, IDEMPOTENCY_TTL)
+    else:
+        store.release(key)
+    return response
+
+def prepare_incident(body: Dict[str, Any], timer: IncidentTimer = None):
+    """Screen an incident payload and resolve its instance ID.
+
+    Returns (incident, None) when the incident can enter the pipeline, or
+    (None, response) with the error response otherwise.
+    """
+    incident_id = body.get('incident_id')
+    server_name = body.get('server_name')
+    server_ip = body.get('server_ip')
+    instance_id = body.get('instance_id')
+    description = body.get('description', '')
+    timer = timer or IncidentTimer(incident_id)
+    
+    # Fields must be strings; a numeric or object instance_id would otherwise fail as a 500
+    for field in ('incident_id', 'server_name', 'server_ip', 'instance_id', 'description'):
+        if body.get(field) is not None and not isinstance(body[field], str):
+            return None, {'statusCode': 400, 'body': json.dumps({'error': f'{field} must be a string'})}
+    
+    # Detect and redact PII
+    with timer.stage('pii_scan') as timing:
         pii_findings = detect_pii(description)
         if pii_findings:
             print(f"PII detected: {pii_findings}")
             description = redact_pii(description)
             body['description'] = description
-        
-        # Detect prompt injection
-        is_injection, injection_msg = detect_prompt_injection(description)
-        if is_injection:
-            print(sanitize_log(f"Security alert: {injection_msg}"))
-            return {'statusCode': 400, 'body': json.dumps({'error': 'Invalid input detected'})}
-        
-        print(sanitize_log(f"Processing incident {incident_id} for {server_name}"))
-        
-        # Get instance ID
-        instance_id = get_ec2_instance_id(server_name)
-        if not instance_id:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'error': f'Instance ID not found for {server_name}'})
-            }
-        
-        print(sanitize_log(f"Instance ID: {instance_id}"))
-        
-        # Step 1: Analyze Agent
-        print(sanitize_log("Invoking Analyze Agent..."))
-        analyze_payload = {
-            'incident_id': incident_id,
-            'instance_id': instance_id,
-            'server_name': server_name
-        }
-        analyze_result = invoke_agentcore_agent(ANALYZE_AGENT_ARN, analyze_payload)
-        if not analyze_result['success']:
-            return {'statusCode': 500, 'body': json.dumps({'error': 'Analyze agent failed', 'details': analyze_result})}
-        print(f"Analyze result: {analyze_result}")
-        
-        # Step 2: Validation Agent
-        print("Invoking Validation Agent...")
-        validation_payload = {
-            'incident_id': incident_id,
-            'instance_id': instance_id,
-            'server_ip': server_ip,
-            'analysis_result': analyze_result.get('result', '')
+        timing['response_bytes'] = len(description.encode('utf-8'))
+    
+    # Detect prompt injection
+    is_injection, injection_msg = detect_prompt_injection(description)
+    if is_injection:
+        print(sanitize_log(f"Security alert: {injection_msg}"))
+        return None, {'statusCode': 400, 'body': json.dumps({'error': 'Invalid input detected'})}
+    
+    print(sanitize_log(f"Processing incident {incident_id} for {server_name}"))
+    
+    # Get instance ID, unless the monitor already attached a well-formed one
+    if not instance_id or not INSTANCE_ID_PATTERN.match(instance_id):
+        with timer.stage('instance_lookup') as timing:
+            instance_id = get_ec2_instance_id(server_name)
+            timing['success'] = bool(instance_id)
+    if not instance_id:
+        return None, {
+            'statusCode': 400,
+            'body': json.dumps({'error': f'Instance ID not found for {server_name}'})
         }
-        validation_result = invoke_agentcore_agent(VALIDATION_AGENT_ARN, validation_payload)
-        if not validation_result['success']:
-            return {'statusCode': 500, 'body': json.dumps({'error': 'Validation agent failed', 'details': validation_result})}
-        print(f"Validation result: {validation_result}")
-        
-        # Check if issue persists
-        validation_text = str(validation_result.get('result', '')).lower()
-        print(f"Validation text check: persists={('persists' in validation_text)}, stopped={('stopped' in validation_text)}")
-        if 'persists' in validation_text or 'stopped' in validation_text or len(validation_text) == 0:
-            # Step 3: SOP Agent
-            print("Invoking SOP Agent...")
-            sop_payload = {
-                'incident_id': incident_id,
-                'instance_id': instance_id,
-                'analysis_result': analyze_result.get('result', ''),
-                'validation_result': validation_result.get('result', '')
-            }
-            sop_result = invoke_agentcore_agent(SOP_AGENT_ARN, sop_payload)
-            if not sop_result['success']:
-                return {'statusCode': 500, 'body': json.dumps({'error': 'SOP agent failed', 'details': sop_result})}
-            print(f"SOP result: {sop_result}")
-            
-            # Step 4: Execution Agent
-            print("Invoking Execution Agent...")
-            execution_payload = {
-                'incident_id': incident_id,
-                'instance_id': instance_id,
-                'server_ip': server_ip,
-                'sop_result': sop_result.get('result', '')
-            }
-            execution_result = invoke_agentcore_agent(EXECUTION_AGENT_ARN, execution_payload)
-            if not execution_result['success']:
-                return {'statusCode': 500, 'body': json.dumps({'error': 'Execution agent failed', 'details': execution_result})}
-            print(f"Execution result: {execution_result}")
-            
-            return {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'incident_id': incident_id,
-                    'status': 'remediated',
-                    'instance_id': instance_id
-                })
-            }
-        else:
-            print("Issue already resolved")
-            return {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'incident_id': incident_id,
-                    'status': 'resolved',
-                    'instance_id': instance_id
-                })
-            }
     
+    print(sanitize_log(f"Instance ID: {instance_id}"))
+    
+    incident = {
+        'incident_id': incident_id,
+        'instance_id': instance_id,
+        'server_name': server_name,
+        'server_ip': server_ip
+    }
+    return incident, None
+
+def process_incident(body: Dict[str, Any]) -> Dict[str, Any]:
+    timer = IncidentTimer(body.get('incident_id'))
+    try:
+        incident, error_response = prepare_incident(body, timer)
+        if error_response:
+            return error_response
+        return run_idempotent(incident, timer)
     except Exception as e:
         print(f"Error processing incident: {str(e)}")
         import traceback
@@ -180,3 +586,100 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
+
+def process_batch(bodies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Process a burst of incidents concurrently, one pipeline per instance.
+
+    Incidents for an instance already in the batch are not processed again and
+    are reported as duplicates of the first one. Agent calls are bounded per
+    agent ARN by AGENT_CONCURRENCY.
+    """
+    if len(bodies) > BATCH_MAX_INCIDENTS:
+        return {'statusCode': 400, 'body': json.dumps({'error': f'Batch exceeds {BATCH_MAX_INCIDENTS} incidents'})}
+
+    # Entries that are not objects are reported per item instead of failing the batch
+    invalid = {'statusCode': 400, 'body': json.dumps({'error': 'Incident must be a JSON object'})}
+    incidents = [body for body in bodies if isinstance(body, dict)]
+
+    # Resolve every instance ID the batch needs with one filtered EC2 call
+    lookups = [
+        body.get('server_name') for body in incidents
+        if body.get('server_name') and not (
+            isinstance(body.get('instance_id'), str) and INSTANCE_ID_PATTERN.match(body['instance_id']))
+    ]
+    if lookups:
+        try:
+            get_instance_resolver().resolve_many(lookups)
+        except Exception as e:
+            print(f"Bulk instance lookup failed: {str(e)}")
+
+    timers = [IncidentTimer(body.get('incident_id') if isinstance(body, dict) else None) for body in bodies]
+
+    def prepare(body, timer):
+        if not isinstance(body, dict):
+            return None, invalid
+        try:
+            return prepare_incident(body, timer)
+        except Exception as e:
+            print(f"Error preparing incident: {str(e)}")
+            return None, {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+
+    with ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS) as executor:
+        prepared = list(executor.map(prepare, bodies, timers))
+
+        results = [None] * len(bodies)
+        first_by_instance = {}
+        futures = {}
+        for index, (incident, error_response) in enumerate(prepared):
+            if error_response:
+                results[index] = error_response
+            elif incident['instance_id'] in first_by_instance:
+                first = prepared[first_by_instance[incident['instance_id']]][0]
+                print(sanitize_log(f"Incident {incident['incident_id']} duplicates {first['incident_id']}"))
+                results[index] = {'statusCode': 200, 'body': json.dumps({
+                    'incident_id': incident['incident_id'],
+                    'status': 'duplicate',
+                    'duplicate_of': first['incident_id'],
+                    'instance_id': incident['instance_id']
+                })}
+            else:
+                first_by_instance[incident['instance_id']] = index
+                futures[executor.submit(run_idempotent, incident, timers[index])] = index
+
+        for future, index in futures.items():
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                print(f"Error processing incident: {str(e)}")
+                results[index] = {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'results': [
+                {'statusCode': result['statusCode'], **json.loads(result['body'])} for result in results
+            ]
+        })
+    }
+
+def lambda_handler(event, context):
+    """Main orchestrator for incident processing.
+
+    Accepts a single incident, or a list / {"incidents": [...]} to process a batch.
+    """
+    try:
+        # Parse incoming event - handle both API Gateway and direct invocation
+        if isinstance(event, dict) and isinstance(event.get('body'), str):
+            body = json.loads(event['body'])
+        else:
+            body = event
+    except ValueError as e:
+        return {'statusCode': 400, 'body': json.dumps({'error': f'Invalid JSON: {str(e)}'})}
+
+    if isinstance(body, list):
+        return process_batch(body)
+    if not isinstance(body, dict):
+        return {'statusCode': 400, 'body': json.dumps({'error': 'Request body must be a JSON object or array'})}
+    if isinstance(body.get('incidents'), list):
+        return process_batch(body['incidents'])
+    return process_incident(body)
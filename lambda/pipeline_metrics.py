@@ -0,0 +1,90 @@
+"""Per-stage timing of the incident pipeline, emitted as CloudWatch Embedded Metric Format records"""
+import json
+import os
+import time
+from contextlib import contextmanager
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'IncidentOrchestrator')
+EMIT_METRICS = os.environ.get('EMIT_METRICS', 'true').lower() == 'true'
+
+def emit_metric(stage: str, duration_ms: float, response_bytes: int, success: bool,
+                metrics: dict = None, **properties) -> None:
+    """Print one EMF record; CloudWatch Logs extracts the metrics from the Lambda log line.
+
+    metrics adds stage-specific counts (name -> value) next to the standard three.
+    """
+    if not EMIT_METRICS:
+        return
+    metrics = metrics or {}
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Stage']],
+                'Metrics': [
+                    {'Name': 'Duration', 'Unit': 'Milliseconds'},
+                    {'Name': 'ResponseBytes', 'Unit': 'Bytes'},
+                    {'Name': 'Success', 'Unit': 'Count'}
+                ] + [{'Name': name, 'Unit': 'Count'} for name in metrics]
+            }]
+        },
+        'Stage': stage,
+        'Duration': round(duration_ms, 1),
+        'ResponseBytes': response_bytes,
+        'Success': 1 if success else 0,
+        **metrics,
+        **properties
+    }
+    print(json.dumps(record))
+
+def result_bytes(result) -> int:
+    """Size of a stage result: the agent's response text, or the serialized result otherwise"""
+    if isinstance(result, dict) and isinstance(result.get('result'), str):
+        return len(result['result'].encode('utf-8'))
+    return len(json.dumps(result, default=str).encode('utf-8'))
+
+class IncidentTimer:
+    """Times the stages of one incident and summarizes them for the response body.
+
+    The incident ID is attached to each record as a property rather than a
+    dimension, so it is searchable in Logs Insights without creating a metric
+    per incident.
+    """
+
+    def __init__(self, incident_id: str = None):
+        self.incident_id = incident_id
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block; the caller may set 'response_bytes', 'success' and 'metrics' on the yielded record"""
+        record = {'response_bytes': 0, 'success': True, 'metrics': {}}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception:
+            record['success'] = False
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.stages[name] = {
+                'duration_ms': round(duration_ms, 1),
+                'response_bytes': record['response_bytes'],
+                'success': record['success']
+            }
+            if record['metrics']:
+                self.stages[name]['metrics'] = record['metrics']
+            emit_metric(name, duration_ms, record['response_bytes'], record['success'],
+                        metrics=record['metrics'], incident_id=self.incident_id)
+
+    def finish(self, outcome: str, success: bool) -> dict:
+        """Emit the end-to-end record and return the per-stage timing summary"""
+        total_ms = (time.perf_counter() - self.started) * 1000
+        response_bytes = sum(stage['response_bytes'] for stage in self.stages.values())
+        emit_metric('pipeline', total_ms, response_bytes, success, incident_id=self.incident_id, outcome=outcome)
+        summary = {'total_ms': round(total_ms, 1), 'stages': self.stages}
+        if self.stages:
+            summary['slowest_stage'] = max(self.stages, key=lambda name: self.stages[name]['duration_ms'])
+        return summary
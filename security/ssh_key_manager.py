@@ -1,34 +1,94 @@
 """SSH key management via AWS Secrets Manager"""
 import boto3
+import logging
 import tempfile
 import os
+import threading
+import time
 from botocore.config import Config
 
+logger = logging.getLogger(__name__)
+
 class SSHKeyManager:
     _shared_client = None
-    
-    def __init__(self, secret_name: str, region: str = 'us-east-1'):
+
+    def __init__(self, secret_name: str, region: str = 'us-east-1', cache_ttl: int = 300):
         self.secret_name = secret_name
+        self.cache_ttl = cache_ttl
         if SSHKeyManager._shared_client is None:
             config = Config(retries={'max_attempts': 3, 'mode': 'standard'})
             SSHKeyManager._shared_client = boto3.client('secretsmanager', region_name=region, config=config)
         self.client = SSHKeyManager._shared_client
-    
+        self._lock = threading.Lock()
+        self._key_path = None
+        self._previous_path = None
+        self._version_id = None
+        # None forces a version check; 0.0 would not while monotonic() is still below the TTL after boot
+        self._checked_at = None
+
     def get_key_file(self) -> str:
-        """Retrieve SSH key from Secrets Manager and write to temp file"""
-        response = self.client.get_secret_value(SecretId=self.secret_name)
-        key_content = response['SecretString']
-        
+        """Return path to the cached key file, refreshing it when the secret rotates"""
+        with self._lock:
+            if self._key_path and self._checked_at is not None \
+                    and time.monotonic() - self._checked_at < self.cache_ttl:
+                return self._key_path
+
+            try:
+                # DescribeSecret exposes the current VersionId without returning key material
+                if self._key_path and self._current_version_id() == self._version_id:
+                    self._checked_at = time.monotonic()
+                    return self._key_path
+                response = self.client.get_secret_value(SecretId=self.secret_name)
+            except Exception as e:
+                if not self._key_path:
+                    raise
+                # Keep probing with the cached key and re-check the secret after another TTL
+                logger.warning(f"SSH key refresh failed, using cached key: {e}")
+                self._checked_at = time.monotonic()
+                return self._key_path
+
+            # Probes in flight may not have read the old key yet, so it is kept until the next rotation
+            if self._previous_path:
+                self.cleanup_key_file(self._previous_path)
+            self._previous_path = self._key_path
+            self._key_path = self._write_key_file(response['SecretString'])
+            self._version_id = response['VersionId']
+            self._checked_at = time.monotonic()
+            return self._key_path
+
+    def invalidate(self) -> None:
+        """Force the next get_key_file() call to re-check the secret version"""
+        with self._lock:
+            self._checked_at = None
+
+    def close(self) -> None:
+        """Delete the cached key files"""
+        with self._lock:
+            for path in (self._key_path, self._previous_path):
+                if path:
+                    self.cleanup_key_file(path)
+            self._key_path = None
+            self._previous_path = None
+            self._version_id = None
+
+    def cleanup_key_file(self, path: str) -> None:
+        """Securely delete temp key file"""
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _current_version_id(self) -> str:
+        response = self.client.describe_secret(SecretId=self.secret_name)
+        for version_id, stages in response.get('VersionIdsToStages', {}).items():
+            if 'AWSCURRENT' in stages:
+                return version_id
+        return None
+
+    def _write_key_file(self, key_content: str) -> str:
         # Create temp file with secure permissions
         fd, path = tempfile.mkstemp(suffix='.pem')
         os.chmod(path, 0o400)
-        
+
         with os.fdopen(fd, 'w') as f:
             f.write(key_content)
-        
+
         return path
-    
-    def cleanup_key_file(self, path: str) -> None:
-        """Securely delete temp key file"""
-        if os.path.exists(path):
-            os.remove(path)
@@ -0,0 +1,135 @@
+"""Server inventory discovered from tag-filtered EC2 instances"""
+import json
+import logging
+import os
+import time
+import boto3
+from botocore.config import Config
+from inventory import InventoryDiff
+
+MONITORED_STATES = ['pending', 'running', 'stopping', 'stopped']
+DEFAULT_TAG_FILTERS = {'Monitoring': 'enabled'}
+
+def parse_tag_filters(value: str) -> dict:
+    """Parse comma-separated Key=Value tag filters, falling back to the default on malformed input"""
+    filters = {}
+    for tag in (value or '').split(','):
+        tag = tag.strip()
+        if not tag:
+            continue
+        key, sep, tag_value = tag.partition('=')
+        if not sep or not key.strip():
+            logging.error(f"Malformed EC2 tag filter {tag!r}, using default {DEFAULT_TAG_FILTERS}")
+            return dict(DEFAULT_TAG_FILTERS)
+        filters[key.strip()] = tag_value.strip()
+    return filters or dict(DEFAULT_TAG_FILTERS)
+
+class EC2Inventory:
+    """Builds the server list from paginated describe_instances calls.
+
+    Each refresh re-lists the tagged instances in full once the TTL expires;
+    only the resulting diff is applied to the scheduler. Results are cached in a
+    local JSON file so restarts within the TTL make no EC2 calls. Servers are
+    indexed by name, private IP and instance ID.
+    """
+
+    def __init__(self, tag_filters: dict, cache_file: str, validator, ttl: int = 300, region: str = 'us-east-1'):
+        self.tag_filters = tag_filters
+        self.cache_file = cache_file
+        self.validator = validator
+        self.ttl = ttl
+        self.client = boto3.client(
+            'ec2', region_name=region, config=Config(retries={'max_attempts': 5, 'mode': 'adaptive'})
+        )
+        self.servers = {}
+        self.by_ip = {}
+        self.by_instance_id = {}
+        self._fetched_at = 0.0
+
+    def reload(self) -> InventoryDiff:
+        """Return the diff against the previous load, or None if nothing was refreshed"""
+        if not self.servers and self._load_cache():
+            return self._apply(self.servers, {})
+        if time.time() - self._fetched_at < self.ttl:
+            return None
+
+        try:
+            servers = self._describe()
+        except Exception as e:
+            logging.error(f"Failed to discover EC2 inventory: {e}")
+            return None
+        self._fetched_at = time.time()
+        self._save_cache(servers)
+        return self._apply(servers, self.servers)
+
+    def find_by_ip(self, ip: str) -> dict:
+        return self.by_ip.get(ip)
+
+    def find_by_instance_id(self, instance_id: str) -> dict:
+        return self.by_instance_id.get(instance_id)
+
+    def _describe(self) -> dict:
+        filters = [{'Name': 'instance-state-name', 'Values': MONITORED_STATES}]
+        filters += [{'Name': f'tag:{key}', 'Values': [value]} for key, value in self.tag_filters.items()]
+
+        servers = {}
+        paginator = self.client.get_paginator('describe_instances')
+        for page in paginator.paginate(Filters=filters, PaginationConfig={'PageSize': 1000}):
+            for reservation in page['Reservations']:
+                for instance in reservation['Instances']:
+                    name = next((tag['Value'] for tag in instance.get('Tags', []) if tag['Key'] == 'Name'), None)
+                    server = self._validated(name, instance.get('PrivateIpAddress'), instance['InstanceId'])
+                    if server:
+                        servers[name] = server
+        return servers
+
+    def _validated(self, name, ip, instance_id) -> dict:
+        """Return the server entry, or None if it is incomplete or fails validation"""
+        if not all(isinstance(value, str) and value for value in (name, ip, instance_id)):
+            return None
+        try:
+            self.validator(name, ip)
+        except ValueError as e:
+            logging.error(f"Server validation failed: {e}")
+            return None
+        return {'name': name, 'ip': ip, 'instance_id': instance_id}
+
+    def _apply(self, servers: dict, previous: dict) -> InventoryDiff:
+        diff = InventoryDiff.between(previous, servers)
+        self.servers = servers
+        self.by_ip = {server['ip']: server for server in servers.values()}
+        self.by_instance_id = {server['instance_id']: server for server in servers.values()}
+        return diff
+
+    def _load_cache(self) -> bool:
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(cache, dict) or not isinstance(cache.get('servers'), dict) \
+                or not isinstance(cache.get('fetched_at'), (int, float)):
+            logging.warning("Ignoring malformed EC2 inventory cache")
+            return False
+        if time.time() - cache['fetched_at'] >= self.ttl:
+            return False
+        # The cache file is re-validated like a live result before any of it is probed
+        servers = {}
+        for entry in cache['servers'].values():
+            if not isinstance(entry, dict):
+                continue
+            server = self._validated(entry.get('name'), entry.get('ip'), entry.get('instance_id'))
+            if server:
+                servers[server['name']] = server
+        self.servers = servers
+        self._fetched_at = cache['fetched_at']
+        return True
+
+    def _save_cache(self, servers: dict) -> None:
+        tmp_path = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'fetched_at': self._fetched_at, 'servers': servers}, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logging.warning(f"Failed to write EC2 inventory cache: {e}")
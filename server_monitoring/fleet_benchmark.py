@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Fleet simulation benchmark for the monitoring loop.
+
+Starts fake SSH endpoints on loopback addresses (127.1.x.y) and a fake
+ServiceNow Table API on localhost, then runs monitor_servers() cycles against
+them and reports cycle time, probes/sec, ServiceNow calls per cycle and memory.
+
+The banner pre-check talks to the fake endpoints over real TCP. The full SSH
+login is simulated in-process with the endpoint's configured latency, since
+the fake endpoints do not implement the SSH protocol.
+
+Example:
+    python3 fleet_benchmark.py --hosts 500 --cycles 5 --failure-rate 0.02 --hang-rate 0.01
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MONITOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server-monitoring-agentcore-demo.py')
+
+class FakeFleet:
+    """Fake SSH endpoints with per-host behaviour: up, down (refused) or hang"""
+
+    def __init__(self, hosts: int, port: int, latency: float, failure_rate: float, hang_rate: float, seed: int):
+        rng = random.Random(seed)
+        self.port = port
+        self.latency = latency
+        self.hosts = {}
+        for i in range(hosts):
+            roll = rng.random()
+            behaviour = 'down' if roll < failure_rate else 'hang' if roll < failure_rate + hang_rate else 'up'
+            name = f"bench-host-{i:05d}"
+            self.hosts[name] = {'name': name, 'ip': f"127.1.{i // 250}.{i % 250 + 1}", 'behaviour': behaviour}
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+
+    def servers(self) -> list:
+        return [{'name': host['name'], 'ip': host['ip']} for host in self.hosts.values()]
+
+    def start(self) -> None:
+        threading.Thread(target=self._run, name='fake-fleet', daemon=True).start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _serve(self) -> None:
+        for host in self.hosts.values():
+            if host['behaviour'] == 'down':
+                continue
+            handler = self._hang if host['behaviour'] == 'hang' else self._banner
+            await asyncio.start_server(handler, host['ip'], self.port)
+
+    async def _banner(self, reader, writer) -> None:
+        await asyncio.sleep(self.latency)
+        writer.write(b"SSH-2.0-OpenSSH_9.6 fake\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def _hang(self, reader, writer) -> None:
+        await reader.read()
+        writer.close()
+
+class FakeServiceNow:
+    """In-memory ServiceNow incident Table API that counts calls"""
+
+    def __init__(self):
+        self.incidents = []
+        self.calls = {'GET': 0, 'POST': 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/now/table/incident"
+
+    def start(self) -> None:
+        threading.Thread(target=self.server.serve_forever, name='fake-servicenow', daemon=True).start()
+
+    def reset_calls(self) -> dict:
+        with self._lock:
+            calls, self.calls = self.calls, {'GET': 0, 'POST': 0}
+        return calls
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                names, states = set(), {'1', '2', '3'}
+                for clause in params.get('sysparm_query', [''])[0].split('^'):
+                    if clause.startswith('u_server_nameIN'):
+                        names = set(clause[len('u_server_nameIN'):].split(','))
+                    elif clause.startswith('u_server_name='):
+                        names = {clause[len('u_server_name='):]}
+                limit = int(params.get('sysparm_limit', ['10000'])[0])
+                offset = int(params.get('sysparm_offset', ['0'])[0])
+                with fake._lock:
+                    fake.calls['GET'] += 1
+                    matches = [i for i in reversed(fake.incidents) if i['u_server_name'] in names and i['state'] in states]
+                self._send(200, {'result': matches[offset:offset + limit]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with fake._lock:
+                    fake.calls['POST'] += 1
+                    incident = {
+                        'number': f"INC{len(fake.incidents) + 1:07d}",
+                        'sys_id': f"{len(fake.incidents) + 1:032x}",
+                        'state': '1',
+                        'u_server_name': body['u_server_name']
+                    }
+                    fake.incidents.append(incident)
+                self._send(201, {'result': incident})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def load_monitor(state_dir: str):
+    """Import the monitor script with its state redirected to a scratch directory"""
+    os.environ['INCIDENT_INDEX_FILE'] = os.path.join(state_dir, 'incident_index.db')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    spec = importlib.util.spec_from_file_location('monitor', MONITOR_SCRIPT)
+    monitor = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(monitor)
+    logging.root.setLevel(logging.ERROR)
+    return monitor
+
+def run(args) -> list:
+    fleet = FakeFleet(args.hosts, args.port, args.latency_ms / 1000, args.failure_rate, args.hang_rate, args.seed)
+    fleet.start()
+    servicenow = FakeServiceNow()
+    servicenow.start()
+
+    monitor = load_monitor(tempfile.mkdtemp(prefix='fleet-benchmark-'))
+    monitor.SSH_PORT = args.port
+    monitor.SSH_TIMEOUT = args.ssh_timeout
+    monitor.MAX_CONCURRENT_PROBES = args.concurrency
+    monitor.FULL_PROBE_INTERVAL = args.full_probe_interval
+    monitor.SSH_PROBE_BACKEND = 'paramiko'
+    monitor.servicenow_client.url = servicenow.url
+    monitor.servicenow_client.get_auth = lambda refresh=False: ('benchmark', 'benchmark')
+
+    def simulated_full_probe(server_name, server_ip):
+        behaviour = fleet.hosts[server_name]['behaviour']
+        if behaviour == 'down':
+            return False, "Connection refused"
+        if behaviour == 'hang':
+            time.sleep(args.ssh_timeout)
+            return False, "SSH connection timeout"
+        time.sleep(args.full_probe_ms / 1000)
+        return True, "Connection successful"
+    monitor.test_ssh_connection_paramiko = simulated_full_probe
+
+    servers = fleet.servers()
+    monitor.scheduler.sync(servers)
+    reports = []
+    for cycle in range(1, args.cycles + 1):
+        servicenow.reset_calls()
+        start = time.monotonic()
+        monitor.monitor_servers(servers)
+        elapsed = time.monotonic() - start
+        calls = servicenow.reset_calls()
+        reports.append({
+            'cycle': cycle,
+            'cycle_seconds': round(elapsed, 3),
+            'probes_per_second': round(len(servers) / elapsed, 1),
+            'servicenow_get': calls['GET'],
+            'servicenow_post': calls['POST'],
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'history_kb': round(monitor.probe_history.memory_bytes() / 1024, 1)
+        })
+    monitor.log_listener.stop()
+    return reports
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', type=int, default=200, help='number of fake SSH endpoints')
+    parser.add_argument('--cycles', type=int, default=5, help='monitor_servers() cycles to run')
+    parser.add_argument('--port', type=int, default=2222, help='port the fake endpoints listen on')
+    parser.add_argument('--latency-ms', type=float, default=20, help='banner latency of healthy endpoints')
+    parser.add_argument('--full-probe-ms', type=float, default=150, help='simulated full SSH login latency')
+    parser.add_argument('--failure-rate', type=float, default=0.02, help='fraction of endpoints refusing connections')
+    parser.add_argument('--hang-rate', type=float, default=0.01, help='fraction of endpoints that accept but never answer')
+    parser.add_argument('--ssh-timeout', type=float, default=2, help='SSH_TIMEOUT used for simulated hangs')
+    parser.add_argument('--concurrency', type=int, default=50, help='MAX_CONCURRENT_PROBES')
+    parser.add_argument('--full-probe-interval', type=int, default=300, help='FULL_PROBE_INTERVAL')
+    parser.add_argument('--seed', type=int, default=42, help='seed for assigning endpoint behaviour')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    reports = run(args)
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    columns = list(reports[0])
+    print("  ".join(f"{column:>17}" for column in columns))
+    for report in reports:
+        print("  ".join(f"{report[column]:>17}" for column in columns))
+
+if __name__ == "__main__":
+    main()
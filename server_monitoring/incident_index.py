@@ -0,0 +1,96 @@
+"""Local SQLite index of open ServiceNow incidents per server"""
+import sqlite3
+import threading
+import time
+
+class IncidentIndex:
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL keeps the index consistent if the monitor is killed mid-write
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS incidents ("
+            "server_name TEXT PRIMARY KEY, number TEXT NOT NULL, sys_id TEXT, state TEXT, "
+            "recovered INTEGER NOT NULL DEFAULT 0, last_seen REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def all(self) -> dict:
+        """Return server name -> incident map for all indexed open incidents"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT server_name, number, sys_id, state, recovered, last_seen FROM incidents"
+            ).fetchall()
+        return {row[0]: self._to_dict(row) for row in rows}
+
+    def get(self, server_name: str) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT server_name, number, sys_id, state, recovered, last_seen FROM incidents WHERE server_name = ?",
+                (server_name,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def upsert(self, server_name: str, incident: dict) -> None:
+        """Record an open incident from a ServiceNow create or query response"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO incidents (server_name, number, sys_id, state, recovered, last_seen) "
+                "VALUES (?, ?, ?, ?, 0, ?)",
+                (server_name, incident['number'], incident.get('sys_id'), incident.get('state'), time.time())
+            )
+
+    def mark_recovered(self, server_name: str) -> None:
+        """Flag that the server recovered while its incident may still be open"""
+        with self._lock:
+            self._conn.execute("UPDATE incidents SET recovered = 1 WHERE server_name = ?", (server_name,))
+
+    def remove(self, server_name: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM incidents WHERE server_name = ?", (server_name,))
+
+    def reconcile(self, incidents: dict) -> None:
+        """Replace the index with a full open-incident snapshot from ServiceNow"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM incidents")
+                self._conn.executemany(
+                    "INSERT INTO incidents (server_name, number, sys_id, state, recovered, last_seen) "
+                    "VALUES (?, ?, ?, ?, 0, ?)",
+                    [(name, i['number'], i.get('sys_id'), i.get('state'), now) for name, i in incidents.items()]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_reconciled', ?)", (str(now),)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def mark_stale(self) -> None:
+        """Force a reconcile on the next cycle, e.g. after servers were added"""
+        with self._lock:
+            self._conn.execute("DELETE FROM meta WHERE key = 'last_reconciled'")
+
+    def last_reconciled(self) -> float:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'last_reconciled'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        return {
+            'number': row[1],
+            'sys_id': row[2],
+            'state': row[3],
+            'recovered': bool(row[4]),
+            'last_seen': row[5]
+        }
@@ -0,0 +1,103 @@
+"""Incremental server inventory loading from JSON or JSON Lines files"""
+import json
+import logging
+import os
+
+class InventoryDiff:
+    def __init__(self, added, removed, changed):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    @classmethod
+    def between(cls, previous: dict, current: dict) -> 'InventoryDiff':
+        return cls(
+            added=[server for name, server in current.items() if name not in previous],
+            removed=[name for name in previous if name not in current],
+            changed=[server for name, server in current.items() if name in previous and previous[name] != server]
+        )
+
+class ServerInventory:
+    """Reloads the inventory file only when it changes and reports what changed.
+
+    Files ending in ``.jsonl`` hold one ``{"name": ..., "ip": ...}`` object per
+    line; unchanged lines are neither re-parsed nor re-validated on reload.
+    Any other file is read as a JSON array of the same objects.
+    """
+
+    def __init__(self, path: str, validator):
+        self.path = path
+        self.validator = validator
+        self.servers = {}
+        self._signature = None
+        self._line_cache = {}
+
+    def reload(self) -> InventoryDiff:
+        """Return the diff against the previous load, or None if the file is unchanged or unreadable"""
+        try:
+            st = os.stat(self.path)
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if signature == self._signature:
+                return None
+            if self.path.endswith('.jsonl'):
+                servers = self._load_jsonl()
+            else:
+                servers = self._load_json()
+        except Exception as e:
+            logging.error(f"Failed to load servers file: {e}")
+            return None
+
+        diff = InventoryDiff.between(self.servers, servers)
+        self.servers = servers
+        self._signature = signature
+        return diff
+
+    def _load_json(self) -> dict:
+        with open(self.path, 'r') as f:
+            entries = json.load(f)
+        servers = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                logging.warning(f"Skipping inventory entry that is not an object: {entry!r}")
+                continue
+            server = self._validated(entry, self.servers.get(entry.get('name')))
+            if server:
+                servers[server['name']] = server
+        return servers
+
+    def _load_jsonl(self) -> dict:
+        servers = {}
+        line_cache = {}
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                server = self._line_cache.get(line)
+                if server is None:
+                    try:
+                        server = self._validated(json.loads(line))
+                    except ValueError as e:
+                        logging.error(f"Skipping malformed inventory line: {e}")
+                        continue
+                if server:
+                    line_cache[line] = server
+                    servers[server['name']] = server
+        self._line_cache = line_cache
+        return servers
+
+    def _validated(self, entry: dict, known: dict = None) -> dict:
+        if not isinstance(entry, dict):
+            logging.error("Server validation failed: inventory entry is not an object")
+            return None
+        if entry == known:
+            return known
+        try:
+            self.validator(entry.get('name'), entry.get('ip'))
+        except (TypeError, ValueError) as e:
+            logging.error(f"Server validation failed: {e}")
+            return None
+        return entry
@@ -0,0 +1,118 @@
+"""Fleet-wide probe history in preallocated per-server ring buffers"""
+import threading
+import time
+from array import array
+
+OUTCOME_CODES = {'success': 1, 'failure': 2, 'timeout': 3}
+OUTCOME_NAMES = {code: name for name, code in OUTCOME_CODES.items()}
+# Banner checks and full SSH logins have different latency distributions, so samples keep their kind
+KIND_CODES = {'full': 1, 'banner': 2}
+
+class ProbeHistory:
+    """Fixed-size ring buffer of (timestamp, latency, outcome) samples per server.
+
+    Samples live in flat typed arrays indexed by ``slot * capacity + position``,
+    so memory is ``14 * capacity`` bytes per server plus bookkeeping. Slots of
+    removed servers are reused. Each sample also records whether it came from
+    a banner check or a full SSH login; availability counts both, latency
+    percentiles use one kind only.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._free = []
+        self._timestamps = array('d')
+        self._latencies = array('f')
+        self._outcomes = array('B')
+        self._kinds = array('B')
+        self._heads = array('I')
+        self._counts = array('I')
+
+    def add(self, server_name: str) -> None:
+        with self._lock:
+            if server_name in self._slots:
+                return
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._heads)
+                self._timestamps.frombytes(bytes(8 * self.capacity))
+                self._latencies.frombytes(bytes(4 * self.capacity))
+                self._outcomes.frombytes(bytes(self.capacity))
+                self._kinds.frombytes(bytes(self.capacity))
+                self._heads.append(0)
+                self._counts.append(0)
+            self._heads[slot] = 0
+            self._counts[slot] = 0
+            self._slots[server_name] = slot
+
+    def remove(self, server_name: str) -> None:
+        with self._lock:
+            slot = self._slots.pop(server_name, None)
+            if slot is not None:
+                self._free.append(slot)
+
+    def record(self, server_name: str, outcome: str, latency: float, timestamp: float = None,
+               kind: str = 'full') -> None:
+        with self._lock:
+            slot = self._slots.get(server_name)
+            if slot is None:
+                return
+            index = slot * self.capacity + self._heads[slot]
+            self._timestamps[index] = time.time() if timestamp is None else timestamp
+            self._latencies[index] = latency
+            self._outcomes[index] = OUTCOME_CODES[outcome]
+            self._kinds[index] = KIND_CODES[kind]
+            self._heads[slot] = (self._heads[slot] + 1) % self.capacity
+            self._counts[slot] = min(self._counts[slot] + 1, self.capacity)
+
+    def samples(self, server_name: str, limit: int = None, window: float = None, kind: str = None) -> list:
+        """Return (timestamp, latency, outcome) tuples, oldest first, optionally of one probe kind only"""
+        with self._lock:
+            slot = self._slots.get(server_name)
+            if slot is None:
+                return []
+            count = self._counts[slot]
+            if limit is not None:
+                count = min(count, limit)
+            base = slot * self.capacity
+            head = self._heads[slot]
+            indexes = [base + (head - count + i) % self.capacity for i in range(count)]
+            if kind is not None:
+                indexes = [i for i in indexes if self._kinds[i] == KIND_CODES[kind]]
+            result = [
+                (self._timestamps[i], self._latencies[i], OUTCOME_NAMES[self._outcomes[i]])
+                for i in indexes
+            ]
+        if window is not None:
+            cutoff = time.time() - window
+            result = [sample for sample in result if sample[0] >= cutoff]
+        return result
+
+    def outcomes(self, server_name: str, limit: int = None) -> list:
+        return [outcome for _, _, outcome in self.samples(server_name, limit=limit)]
+
+    def availability(self, server_name: str, window: float = None) -> float:
+        """Fraction of successful probes, or None without samples"""
+        outcomes = [outcome for _, _, outcome in self.samples(server_name, window=window)]
+        if not outcomes:
+            return None
+        return outcomes.count('success') / len(outcomes)
+
+    def latency_percentile(self, server_name: str, percentile: float = 95, window: float = None,
+                           kind: str = 'full') -> float:
+        """Nearest-rank latency percentile of successful probes of one kind, or None without samples"""
+        latencies = sorted(
+            latency for _, latency, outcome in self.samples(server_name, window=window, kind=kind)
+            if outcome == 'success'
+        )
+        if not latencies:
+            return None
+        rank = max(int(round(percentile / 100 * len(latencies))) - 1, 0)
+        return latencies[min(rank, len(latencies) - 1)]
+
+    def memory_bytes(self) -> int:
+        arrays = (self._timestamps, self._latencies, self._outcomes, self._kinds, self._heads, self._counts)
+        return sum(a.itemsize * len(a) for a in arrays)
@@ -0,0 +1,120 @@
+"""Adaptive per-server probe scheduling"""
+import heapq
+import random
+import time
+from probe_history import ProbeHistory
+
+class ProbeScheduler:
+    def __init__(self, base_interval: float, min_interval: float, max_interval: float,
+                 backoff: float = 2.0, jitter: float = 0.1, flap_window: int = 10, flap_threshold: int = 3,
+                 lag_observer=None, history: ProbeHistory = None):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.flap_window = flap_window
+        self.flap_threshold = flap_threshold
+        self.lag_observer = lag_observer
+        self.history = history or ProbeHistory(flap_window)
+        self._heap = []
+        self._entries = {}
+
+    def sync(self, servers) -> set:
+        """Add new servers, refresh changed ones and drop servers no longer in the inventory.
+        
+        Returns the names of newly added servers.
+        """
+        names = {server['name'] for server in servers}
+        self.remove([name for name in self._entries if name not in names])
+        return self.upsert(servers)
+
+    def upsert(self, servers) -> set:
+        """Add or refresh the given servers only, returning the names of newly added ones"""
+        now = time.monotonic()
+        added = set()
+        for server in servers:
+            entry = self._entries.get(server['name'])
+            if entry:
+                entry['server'] = server
+                continue
+            added.add(server['name'])
+            # Spread first probes of newly added servers over one base interval
+            self._entries[server['name']] = {
+                'server': server,
+                'interval': self.base_interval,
+                'due': None
+            }
+            self.history.add(server['name'])
+            self._schedule(server['name'], now + random.uniform(0, self.base_interval))
+        return added
+
+    def remove(self, server_names) -> None:
+        # Heap entries of removed servers are skipped lazily in pop_due()
+        for name in server_names:
+            if self._entries.pop(name, None) is not None:
+                self.history.remove(name)
+
+    def pop_due(self, now: float = None) -> list:
+        """Remove and return all servers whose next probe is due"""
+        now = time.monotonic() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, name = heapq.heappop(self._heap)
+            entry = self._entries.get(name)
+            # Skip heap entries for removed or rescheduled servers
+            if entry is None or entry['due'] != due_at:
+                continue
+            entry['due'] = None
+            due.append(entry['server'])
+            if self.lag_observer:
+                self.lag_observer(max(now - due_at, 0.0))
+        return due
+
+    def record(self, server_name: str, outcome: str, latency: float = 0.0, kind: str = 'full') -> None:
+        """Add the probe outcome to the history and schedule the next probe from it"""
+        entry = self._entries.get(server_name)
+        if entry is None:
+            return
+        self.history.record(server_name, outcome, latency, kind=kind)
+
+        if outcome != 'success' or self.is_flapping(server_name):
+            interval = self.min_interval
+        else:
+            # Back off exponentially with the length of the current healthy streak
+            streak = 0
+            for previous in reversed(self.history.outcomes(server_name)):
+                if previous != 'success':
+                    break
+                streak += 1
+            interval = min(self.base_interval * self.backoff ** (streak - 1), self.max_interval)
+        entry['interval'] = interval
+        self._schedule(server_name, time.monotonic() + interval)
+
+    def retry(self, server_name: str) -> None:
+        """Re-queue a server whose probe did not complete"""
+        if server_name in self._entries:
+            self._schedule(server_name, time.monotonic() + self.min_interval)
+
+    def is_flapping(self, server_name: str) -> bool:
+        recent = [outcome == 'success' for outcome in self.history.outcomes(server_name, limit=self.flap_window)]
+        transitions = sum(1 for a, b in zip(recent, recent[1:]) if a != b)
+        return transitions >= self.flap_threshold
+
+    def seconds_until_next(self) -> float:
+        while self._heap:
+            due_at, name = self._heap[0]
+            entry = self._entries.get(name)
+            if entry is not None and entry['due'] == due_at:
+                return max(due_at - time.monotonic(), 0.0)
+            heapq.heappop(self._heap)
+        return self.base_interval
+
+    def server_names(self) -> list:
+        return list(self._entries)
+
+    def _schedule(self, server_name: str, due_at: float) -> None:
+        if self.jitter:
+            due_at += random.uniform(-self.jitter, self.jitter) * self._entries[server_name]['interval']
+        self._entries[server_name]['due'] = due_at
+        heapq.heappush(self._heap, (due_at, server_name))
@@ -1,67 +1,168 @@
 #!/usr/bin/env python3
-import json
 import time
+import asyncio
+import contextlib
 import subprocess
-import requests
 import logging
+import logging.handlers
+import queue
 from datetime import datetime
 import os
 import sys
-import boto3
-import base64
 import re
 import shlex
+import socket
+from concurrent.futures import ThreadPoolExecutor, wait
 
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'security'))
 from ssh_key_manager import SSHKeyManager
 from log_sanitizer import sanitize_log
+from servicenow_client import ServiceNowClient
+from incident_index import IncidentIndex
+from ssh_probe_pool import SSHProbePool
+from probe_scheduler import ProbeScheduler
+from probe_history import ProbeHistory
+from inventory import ServerInventory
+from ec2_inventory import EC2Inventory, parse_tag_filters
+from metrics import Registry, instrument_boto3_client, start_http_server
+from shard_coordinator import ShardCoordinator, FileLeaseBackend, DynamoDBLeaseBackend
 
 # Configuration
-SERVERS_FILE = "servers.json"
+SERVERS_FILE = os.environ.get('SERVERS_FILE', "servers.json")
+INVENTORY_SOURCE = os.environ.get('INVENTORY_SOURCE', 'file')
+EC2_INVENTORY_TAGS = os.environ.get('EC2_INVENTORY_TAGS', 'Monitoring=enabled')
+EC2_INVENTORY_TTL = int(os.environ.get('EC2_INVENTORY_TTL', 300))
 SSH_KEY_SECRET = "incident-management/ssh-key"
 SSH_USER = "ec2-user"
 SSH_TIMEOUT = 10
+SSH_PORT = 22
 SERVICENOW_URL = "https://dev192162.service-now.com/api/now/table/incident"
 SERVICENOW_CREDENTIALS_SECRET = "incident-management/servicenow-credentials"
 CHECK_INTERVAL = 30
-ssh_key_manager = SSHKeyManager(SSH_KEY_SECRET)
+LOG_RETENTION_DAYS = int(os.environ.get('LOG_RETENTION_DAYS', 14))
+PROBE_MIN_INTERVAL = int(os.environ.get('PROBE_MIN_INTERVAL', 10))
+PROBE_MAX_INTERVAL = int(os.environ.get('PROBE_MAX_INTERVAL', 300))
+PROBE_BACKOFF = float(os.environ.get('PROBE_BACKOFF', 2))
+PROBE_JITTER = float(os.environ.get('PROBE_JITTER', 0.1))
+PROBE_HISTORY_SIZE = int(os.environ.get('PROBE_HISTORY_SIZE', 64))
+MAX_CONCURRENT_PROBES = int(os.environ.get('MAX_CONCURRENT_PROBES', 50))
+CYCLE_DEADLINE = int(os.environ.get('CYCLE_DEADLINE', 25))
+BANNER_TIMEOUT = float(os.environ.get('BANNER_TIMEOUT', 2))
+BANNER_CONCURRENCY = int(os.environ.get('BANNER_CONCURRENCY', 256))
+FULL_PROBE_INTERVAL = int(os.environ.get('FULL_PROBE_INTERVAL', 300))
+SSH_PROBE_BACKEND = os.environ.get('SSH_PROBE_BACKEND', 'paramiko')
+SSH_KEY_CACHE_TTL = int(os.environ.get('SSH_KEY_CACHE_TTL', 300))
+SERVICENOW_CREDENTIALS_TTL = int(os.environ.get('SERVICENOW_CREDENTIALS_TTL', 3600))
+SERVICENOW_CREDENTIALS_RETRY_AFTER = int(os.environ.get('SERVICENOW_CREDENTIALS_RETRY_AFTER', 30))
+SERVICENOW_MAX_RETRIES = int(os.environ.get('SERVICENOW_MAX_RETRIES', 3))
+SERVICENOW_BACKOFF_FACTOR = float(os.environ.get('SERVICENOW_BACKOFF_FACTOR', 0.5))
+SERVICENOW_PAGE_SIZE = int(os.environ.get('SERVICENOW_PAGE_SIZE', 100))
+STATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'state')
+SHARD_BACKEND = os.environ.get('SHARD_BACKEND', 'none')
+SHARD_WORKER_ID = os.environ.get('SHARD_WORKER_ID', socket.gethostname())
+SHARD_LEASE_TTL = int(os.environ.get('SHARD_LEASE_TTL', 90))
+SHARD_LEASE_DIR = os.environ.get('SHARD_LEASE_DIR', os.path.join(STATE_DIR, 'leases'))
+SHARD_LEASE_TABLE = os.environ.get('SHARD_LEASE_TABLE', 'incident-management-monitor-leases')
+INCIDENT_INDEX_FILE = os.environ.get(
+    'INCIDENT_INDEX_FILE',
+    os.path.join(STATE_DIR, 'incident_index.db' if SHARD_BACKEND == 'none' else f'incident_index_{SHARD_WORKER_ID}.db')
+)
+EC2_INVENTORY_CACHE_FILE = os.environ.get('EC2_INVENTORY_CACHE_FILE', os.path.join(STATE_DIR, 'ec2_inventory.json'))
+INCIDENT_RECONCILE_INTERVAL = int(os.environ.get('INCIDENT_RECONCILE_INTERVAL', 900))
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 0))
+METRICS_BIND = os.environ.get('METRICS_BIND', '127.0.0.1')
 
-def get_servicenow_auth():
-    """Get ServiceNow Basic Auth from Secrets Manager"""
-    try:
-        client = boto3.client('secretsmanager', region_name='us-east-1')
-        response = client.get_secret_value(SecretId=SERVICENOW_CREDENTIALS_SECRET)
-        creds = json.loads(response['SecretString'])
-        auth_string = f"{creds['username']}:{creds['password']}"
-        return base64.b64encode(auth_string.encode()).decode()
-    except Exception as e:
-        logging.error(f"Failed to get ServiceNow credentials: {e}")
-        return None
+# Metrics
+metrics_registry = Registry()
+SSH_PROBE_SECONDS = metrics_registry.histogram('monitor_ssh_probe_duration_seconds', 'SSH probe latency by stage and outcome')
+CYCLE_SECONDS = metrics_registry.histogram('monitor_cycle_duration_seconds', 'Wall time of one probe and incident-handling cycle')
+SCHEDULER_LAG_SECONDS = metrics_registry.histogram('monitor_scheduler_lag_seconds', 'Delay between a probe falling due and being started')
+SERVICENOW_REQUEST_SECONDS = metrics_registry.histogram('monitor_servicenow_request_duration_seconds', 'ServiceNow Table API latency')
+SERVICENOW_ERRORS = metrics_registry.counter('monitor_servicenow_errors_total', 'Failed ServiceNow Table API calls')
+SECRETS_REQUEST_SECONDS = metrics_registry.histogram('monitor_secretsmanager_request_duration_seconds', 'Secrets Manager API latency')
+SECRETS_ERRORS = metrics_registry.counter('monitor_secretsmanager_errors_total', 'Failed Secrets Manager API calls')
+INCIDENTS_CREATED = metrics_registry.counter('monitor_incidents_created_total', 'ServiceNow incidents created by the monitor')
+
+ssh_key_manager = SSHKeyManager(SSH_KEY_SECRET, cache_ttl=SSH_KEY_CACHE_TTL)
+servicenow_client = ServiceNowClient(
+    SERVICENOW_URL,
+    SERVICENOW_CREDENTIALS_SECRET,
+    credentials_ttl=SERVICENOW_CREDENTIALS_TTL,
+    credentials_retry_after=SERVICENOW_CREDENTIALS_RETRY_AFTER,
+    max_retries=SERVICENOW_MAX_RETRIES,
+    backoff_factor=SERVICENOW_BACKOFF_FACTOR,
+    pool_size=MAX_CONCURRENT_PROBES
+)
+def record_servicenow_response(response, *args, **kwargs):
+    SERVICENOW_REQUEST_SECONDS.observe(response.elapsed.total_seconds(), method=response.request.method)
+    if response.status_code >= 400:
+        SERVICENOW_ERRORS.inc(method=response.request.method, reason=str(response.status_code))
+
+servicenow_client.session.hooks['response'].append(record_servicenow_response)
+instrument_boto3_client(ssh_key_manager.client, SECRETS_REQUEST_SECONDS, SECRETS_ERRORS, secret='ssh-key')
+instrument_boto3_client(servicenow_client.secrets_client, SECRETS_REQUEST_SECONDS, SECRETS_ERRORS, secret='servicenow-credentials')
+os.makedirs(os.path.dirname(INCIDENT_INDEX_FILE), exist_ok=True)
+incident_index = IncidentIndex(INCIDENT_INDEX_FILE)
+ssh_probe_pool = SSHProbePool(ssh_key_manager, SSH_USER, timeout=SSH_TIMEOUT, port=SSH_PORT)
+last_full_probe = {}
+probe_history = ProbeHistory(PROBE_HISTORY_SIZE)
+scheduler = ProbeScheduler(
+    CHECK_INTERVAL,
+    PROBE_MIN_INTERVAL,
+    PROBE_MAX_INTERVAL,
+    backoff=PROBE_BACKOFF,
+    jitter=PROBE_JITTER,
+    lag_observer=SCHEDULER_LAG_SECONDS.observe,
+    history=probe_history
+)
+shard_coordinator = None
+if SHARD_BACKEND == 'file':
+    shard_coordinator = ShardCoordinator(FileLeaseBackend(SHARD_LEASE_DIR), SHARD_WORKER_ID, lease_ttl=SHARD_LEASE_TTL)
+elif SHARD_BACKEND == 'dynamodb':
+    shard_coordinator = ShardCoordinator(DynamoDBLeaseBackend(SHARD_LEASE_TABLE), SHARD_WORKER_ID, lease_ttl=SHARD_LEASE_TTL)
+
+class SanitizingQueueListener(logging.handlers.QueueListener):
+    """Redacts each record once, on the listener thread, before it is passed to the handlers"""
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.msg = sanitize_log(record.getMessage())
+        record.args = None
+        return record
 
 # Setup logging
 def setup_logging():
-    """Setup logging with date-formatted file in log folder"""
-    log_date = datetime.now().strftime('%Y-%m-%d')
+    """Route log records through a queue to a daily-rotating file and the console.
+    
+    Callers only enqueue records; formatting, sanitization and disk I/O run on
+    the QueueListener thread.
+    """
     log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'log')
-    log_file = os.path.join(log_dir, f'monitoring_{log_date}.log')
+    log_file = os.path.join(log_dir, 'monitoring.log')
     
     # Ensure log directory exists
     os.makedirs(log_dir, exist_ok=True)
     
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        log_file, when='midnight', backupCount=LOG_RETENTION_DAYS, encoding='utf-8'
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    listener = SanitizingQueueListener(log_queue, file_handler, stream_handler)
+    
     # Clear existing handlers
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
+    logging.root.addHandler(logging.handlers.QueueHandler(log_queue))
+    logging.root.setLevel(logging.INFO)
     
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
+    listener.start()
+    return listener
 
-setup_logging()
+log_listener = setup_logging()
 
 def validate_server_input(server_name, server_ip):
     """Validate server name and IP to prevent command injection"""
@@ -72,25 +173,18 @@ def validate_server_input(server_name, server_ip):
         raise ValueError(f"Invalid server IP format: {server_ip}")
     return True
 
-def load_servers():
-    """Load server list from JSON file"""
-    try:
-        with open(SERVERS_FILE, 'r') as f:
-            servers = json.load(f)
-            # Validate all servers on load
-            for server in servers:
-                validate_server_input(server['name'], server['ip'])
-            return servers
-    except ValueError as e:
-        logging.error(f"Server validation failed: {e}")
-        return []
-    except Exception as e:
-        logging.error(f"Failed to load servers file: {e}")
-        return []
+if INVENTORY_SOURCE == 'ec2':
+    inventory = EC2Inventory(
+        parse_tag_filters(EC2_INVENTORY_TAGS),
+        EC2_INVENTORY_CACHE_FILE,
+        validate_server_input,
+        ttl=EC2_INVENTORY_TTL
+    )
+else:
+    inventory = ServerInventory(SERVERS_FILE, validate_server_input)
 
 def test_ssh_connection(server_name, server_ip):
     """Test SSH connection to server"""
-    ssh_key_path = None
     try:
         # Validate inputs to prevent command injection
         validate_server_input(server_name, server_ip)
@@ -115,143 +209,357 @@ def test_ssh_connection(server_name, server_ip):
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=SSH_TIMEOUT)  # nosemgrep: dangerous-subprocess-use-audit
         
         if result.returncode == 0:
-            logging.info(sanitize_log(f"SSH connection to {server_name} successful"))
+            logging.info(f"SSH connection to {server_name} successful")
             return True, "Connection successful"
         else:
             error_msg = result.stderr.strip() or "SSH connection failed"
-            logging.warning(sanitize_log(f"SSH connection to {server_name} failed: {error_msg}"))
+            if "Permission denied" in error_msg:
+                # Key may have been rotated since the last version check
+                ssh_key_manager.invalidate()
+            logging.warning(f"SSH connection to {server_name} failed: {error_msg}")
             return False, error_msg
             
     except subprocess.TimeoutExpired:
         error_msg = "SSH connection timeout"
-        logging.warning(sanitize_log(f"SSH connection to {server_name} timed out"))
+        logging.warning(f"SSH connection to {server_name} timed out")
         return False, error_msg
     except Exception as e:
         error_msg = f"SSH test error: {str(e)}"
-        logging.error(sanitize_log(f"SSH test to {server_name} error: {e}"))
+        logging.error(f"SSH test to {server_name} error: {e}")
         return False, error_msg
-    finally:
-        if ssh_key_path:
-            ssh_key_manager.cleanup_key_file(ssh_key_path)
-
 
+def test_ssh_connection_paramiko(server_name, server_ip):
+    """Test SSH connection over a persistent paramiko transport"""
+    try:
+        validate_server_input(server_name, server_ip)
+        ssh_success, message = ssh_probe_pool.probe(server_name, server_ip)
+        if ssh_success:
+            logging.info(f"SSH connection to {server_name} successful")
+        else:
+            logging.warning(f"SSH connection to {server_name} failed: {message}")
+        return ssh_success, message
+    except Exception as e:
+        error_msg = f"SSH test error: {str(e)}"
+        logging.error(f"SSH test to {server_name} error: {e}")
+        return False, error_msg
 
-def check_existing_incident(server_name):
-    """Check if open incident exists for server in ServiceNow"""
+def get_open_incidents(server_names):
+    """Fetch open incidents for many servers in paginated bulk queries.
+    
+    Returns a server name -> latest open incident map, or None if ServiceNow
+    could not be queried.
+    """
+    incidents = {}
     try:
-        auth_token = get_servicenow_auth()
-        if not auth_token:
-            return None
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {auth_token}"
-        }
-        
-        query = f"u_server_name={server_name}^stateIN1,2,3^ORDERBYDESCsys_created_on"
-        response = requests.get(
-            f"{SERVICENOW_URL}?sysparm_query={query}&sysparm_fields=number,state,sys_id",
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            results = response.json().get("result", [])
-            if results:
-                return results[0]["number"]
-        return None
+        for i in range(0, len(server_names), SERVICENOW_PAGE_SIZE):
+            names = ",".join(server_names[i:i + SERVICENOW_PAGE_SIZE])
+            query = f"u_server_nameIN{names}^stateIN1,2,3^ORDERBYDESCsys_created_on"
+            offset = 0
+            while True:
+                response = servicenow_client.get(params={
+                    'sysparm_query': query,
+                    'sysparm_fields': 'number,state,sys_id,u_server_name',
+                    'sysparm_limit': SERVICENOW_PAGE_SIZE,
+                    'sysparm_offset': offset
+                })
+                if response.status_code != 200:
+                    logging.error(f"Failed to query open incidents: {response.status_code}")
+                    return None
+                
+                results = response.json().get("result", [])
+                for incident in results:
+                    # Results are newest first, keep the latest incident per server
+                    incidents.setdefault(incident["u_server_name"], incident)
+                if len(results) < SERVICENOW_PAGE_SIZE:
+                    break
+                offset += SERVICENOW_PAGE_SIZE
+        return incidents
     except Exception as e:
-        logging.error(sanitize_log(f"Error checking existing incident: {e}"))
+        SERVICENOW_ERRORS.inc(method='GET', reason=type(e).__name__)
+        logging.error(f"Error checking existing incidents: {e}")
         return None
 
-def create_servicenow_incident(server_name, server_ip):
+def describe_probe_history(server_name):
+    """Summarize recent probe availability and latency for incident descriptions"""
+    samples = probe_history.samples(server_name)
+    availability = probe_history.availability(server_name)
+    if availability is None:
+        return ""
+    summary = f" Probe availability over the last {len(samples)} probes: {availability:.0%}."
+    p95 = probe_history.latency_percentile(server_name, 95)
+    if p95 is not None:
+        summary += f" p95 SSH login latency: {p95:.2f}s."
+    return summary
+
+def create_servicenow_incident(server_name, server_ip, instance_id=None):
     """Create ServiceNow incident (triggers AgentCore via business rule)"""
     try:
         incident_data = {
             "short_description": f"SSH Connection Failure: {server_name}",
-            "description": f"Automated SSH connectivity failure detected for {server_name} at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            "description": f"Automated SSH connectivity failure detected for {server_name} at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.{describe_probe_history(server_name)}",
             "u_server_name": server_name,
             "u_server_ip": server_ip
         }
+        if instance_id:
+            # Lets the orchestrator skip its own instance ID lookup
+            incident_data["u_instance_id"] = instance_id
         
-        auth_token = get_servicenow_auth()
-        if not auth_token:
-            logging.error("Cannot create incident: ServiceNow credentials unavailable")
-            return False, None
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {auth_token}"
-        }
-        
-        response = requests.post(
-            SERVICENOW_URL,
-            headers=headers,
-            json=incident_data,
-            timeout=30
-        )
+        response = servicenow_client.post(incident_data)
         
         if response.status_code == 201:
-            incident_number = response.json()["result"]["number"]
-            logging.info(sanitize_log(f"✓ Incident {incident_number} created for {server_name} - AgentCore workflow triggered"))
-            return True, incident_number
+            incident = response.json()["result"]
+            INCIDENTS_CREATED.inc()
+            logging.info(f"✓ Incident {incident['number']} created for {server_name} - AgentCore workflow triggered")
+            return True, incident
         else:
-            logging.error(sanitize_log(f"Failed to create incident: {response.status_code}"))
+            logging.error(f"Failed to create incident: {response.status_code}")
             return False, None
             
     except Exception as e:
-        logging.error(sanitize_log(f"Error creating incident: {e}"))
+        SERVICENOW_ERRORS.inc(method='POST', reason=type(e).__name__)
+        logging.error(f"Error creating incident: {e}")
         return False, None
 
-def monitor_servers():
-    """Main monitoring function"""
-    servers = load_servers()
+def refresh_incident_index(server_names):
+    """Reconcile the local incident index with ServiceNow when it is due"""
+    if time.time() - incident_index.last_reconciled() < INCIDENT_RECONCILE_INTERVAL:
+        return True
+    
+    open_incidents = get_open_incidents(server_names)
+    if open_incidents is None:
+        return False
+    incident_index.reconcile(open_incidents)
+    logging.info(f"Incident index reconciled: {len(open_incidents)} open incidents")
+    return True
+
+def confirm_open_incident(server_name):
+    """Re-check a single server's incident after it was seen recovering"""
+    open_incidents = get_open_incidents([server_name])
+    if open_incidents is None:
+        return None
+    if server_name in open_incidents:
+        incident_index.upsert(server_name, open_incidents[server_name])
+        return incident_index.get(server_name)
+    incident_index.remove(server_name)
+    return {}
+
+async def read_ssh_banner(server_ip):
+    """Connect to the SSH port and check that the server sends an SSH banner"""
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(server_ip, SSH_PORT), timeout=BANNER_TIMEOUT
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        banner = await asyncio.wait_for(reader.readline(), timeout=BANNER_TIMEOUT)
+        return banner.startswith((b"SSH-2.0", b"SSH-1.99"))
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        writer.close()
+        # Wait for the transport to close so sockets are not leaked across cycles
+        with contextlib.suppress(Exception):
+            await writer.wait_closed()
+
+async def check_ssh_banner(server_ip, semaphore):
+    async with semaphore:
+        start = time.monotonic()
+        banner_ok = await read_ssh_banner(server_ip)
+        latency = time.monotonic() - start
+        SSH_PROBE_SECONDS.observe(latency, stage='banner', outcome='success' if banner_ok else 'failure')
+        return banner_ok, latency
+
+async def check_ssh_banners(servers):
+    """Run banner pre-checks for all servers concurrently"""
+    semaphore = asyncio.Semaphore(BANNER_CONCURRENCY)
+    results = await asyncio.gather(*(check_ssh_banner(server['ip'], semaphore) for server in servers))
+    return {server['name']: result for server, result in zip(servers, results)}
+
+def probe_outcome(ssh_success, message):
+    if ssh_success:
+        return 'success'
+    return 'timeout' if 'timeout' in message.lower() else 'failure'
+
+def timed_probe(probe, server_name, server_ip):
+    start = time.monotonic()
+    ssh_success, message = probe(server_name, server_ip)
+    latency = time.monotonic() - start
+    SSH_PROBE_SECONDS.observe(latency, stage='full', outcome=probe_outcome(ssh_success, message))
+    return ssh_success, message, latency, 'full'
+
+def run_full_probes(servers, timeout):
+    """Run authenticated SSH probes concurrently, bounded by the timeout"""
+    results = {}
     if not servers:
-        logging.error("No servers to monitor")
+        return results
+    probe = test_ssh_connection_paramiko if SSH_PROBE_BACKEND == 'paramiko' else test_ssh_connection
+    executor = ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_PROBES, len(servers)))
+    futures = {
+        executor.submit(timed_probe, probe, server['name'], server['ip']): server
+        for server in servers
+    }
+    
+    done, not_done = wait(futures, timeout=timeout)
+    for future in done:
+        results[futures[future]['name']] = future.result()
+    
+    # Hosts that missed the deadline are left undecided until the next cycle
+    for future in not_done:
+        future.cancel()
+        logging.warning(f"SSH probe to {futures[future]['name']} exceeded cycle deadline")
+    
+    executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+def probe_servers(servers):
+    """Probe all servers within the cycle deadline.
+    
+    A cheap banner check runs for every server; the full SSH login only runs
+    when the banner check fails or the server's FULL_PROBE_INTERVAL is due.
+    Returns a server name -> (ssh_success, message, latency, kind) map, where
+    kind is 'banner' or 'full'.
+    """
+    deadline = time.monotonic() + CYCLE_DEADLINE
+    banners = asyncio.run(check_ssh_banners(servers))
+    
+    results = {}
+    full_probe_servers = []
+    now = time.monotonic()
+    for server in servers:
+        server_name = server['name']
+        banner_ok, banner_latency = banners[server_name]
+        if banner_ok and now - last_full_probe.get(server_name, float('-inf')) < FULL_PROBE_INTERVAL:
+            results[server_name] = (True, "SSH banner received", banner_latency, 'banner')
+        else:
+            full_probe_servers.append(server)
+    
+    full_results = run_full_probes(full_probe_servers, max(deadline - time.monotonic(), 0))
+    for server_name, (ssh_success, _, _, _) in full_results.items():
+        if ssh_success:
+            last_full_probe[server_name] = time.monotonic()
+    results.update(full_results)
+    
+    logging.info(f"Banner-only: {len(servers) - len(full_probe_servers)}, full SSH probes: {len(full_probe_servers)}")
+    return results
+
+def reload_inventory():
+    """Apply servers.json changes and shard membership changes to the probe scheduler"""
+    diff = inventory.reload()
+    membership_changed = False
+    if shard_coordinator:
+        try:
+            membership_changed = shard_coordinator.refresh()
+        except Exception as e:
+            logging.error(f"Shard lease renewal failed: {e}")
+    if not diff and not membership_changed:
         return
     
-    logging.info(f"Monitoring {len(servers)} servers")
+    if not inventory.servers:
+        logging.error("No servers to monitor")
+    
+    initial_load = not scheduler.server_names()
+    if membership_changed or initial_load:
+        servers = list(inventory.servers.values())
+        if shard_coordinator:
+            servers = shard_coordinator.filter(servers)
+        added = scheduler.sync(servers)
+        ssh_probe_pool.prune({server['name']: server['ip'] for server in servers})
+    else:
+        # Ownership depends only on the server name, so only the diff needs routing
+        upserts = diff.added + diff.changed
+        if shard_coordinator:
+            upserts = shard_coordinator.filter(upserts)
+        added = scheduler.upsert(upserts)
+        scheduler.remove(diff.removed)
+        ssh_probe_pool.prune({
+            name: inventory.servers[name]['ip'] for name in scheduler.server_names() if name in inventory.servers
+        })
+        logging.info(f"Inventory changed: {len(diff.added)} added, {len(diff.removed)} removed, {len(diff.changed)} changed")
+    
+    if added and (not initial_load or shard_coordinator):
+        # Newly added or re-sharded servers may already have open incidents
+        incident_index.mark_stale()
+    logging.info(f"Monitoring {len(scheduler.server_names())}/{len(inventory.servers)} servers")
+
+def monitor_servers(servers):
+    """Probe the servers that are due and handle incidents for them"""
+    cycle_start = time.monotonic()
+    probe_results = probe_servers(servers)
+    logging.info(f"Probed {len(probe_results)}/{len(servers)} due servers in {time.monotonic() - cycle_start:.1f}s")
+    
+    for server in servers:
+        if server['name'] in probe_results:
+            ssh_success, message, latency, kind = probe_results[server['name']]
+            scheduler.record(server['name'], probe_outcome(ssh_success, message), latency, kind=kind)
+        else:
+            scheduler.retry(server['name'])
+    
+    if not refresh_incident_index(scheduler.server_names()):
+        logging.error("Skipping incident handling this cycle: incident index reconcile failed")
+        return
+    indexed_incidents = incident_index.all()
     
     for server in servers:
         server_name = server['name']
         server_ip = server['ip']
         
-        ssh_success, _ = test_ssh_connection(server_name, server_ip)
+        if server_name not in probe_results:
+            continue
+        ssh_success, _, _, _ = probe_results[server_name]
+        incident = indexed_incidents.get(server_name)
         
         if not ssh_success:
-            existing_incident = check_existing_incident(server_name)
-            if existing_incident:
-                logging.info(f"Open incident {existing_incident} already exists for {server_name}")
+            if incident and incident['recovered']:
+                # The incident may have been auto-closed after recovery
+                incident = confirm_open_incident(server_name)
+                if incident is None:
+                    continue
+            if incident:
+                logging.info(f"Open incident {incident['number']} already exists for {server_name}")
             else:
                 logging.warning(f"⚠ SSH FAILED: {server_name} ({server_ip})")
-                create_servicenow_incident(server_name, server_ip)
-        else:
-            existing_incident = check_existing_incident(server_name)
-            if existing_incident:
-                logging.info(f"✓ {server_name} recovered - Incident {existing_incident} will be auto-closed")
-    
-    for handler in logging.getLogger().handlers:
-        if hasattr(handler, 'flush'):
-            handler.flush()
+                created, new_incident = create_servicenow_incident(server_name, server_ip, server.get('instance_id'))
+                if created:
+                    incident_index.upsert(server_name, new_incident)
+        elif incident and not incident['recovered']:
+            logging.info(f"✓ {server_name} recovered - Incident {incident['number']} will be auto-closed")
+            incident_index.mark_recovered(server_name)
 
 def main():
     """Main function with continuous monitoring loop"""
-    # Initial logging setup
-    setup_logging()
     logging.info("Server monitoring script started")
+    if METRICS_PORT:
+        start_http_server(metrics_registry, METRICS_PORT, METRICS_BIND)
+        logging.info(f"Metrics endpoint listening on {METRICS_BIND}:{METRICS_PORT}/metrics")
     
     try:
+        next_reload = 0
         while True:
-            # Setup logging for current date
-            setup_logging()
-            monitor_servers()
-            logging.info(f"Waiting {CHECK_INTERVAL} seconds before next check...")
-            time.sleep(CHECK_INTERVAL)  # nosemgrep: arbitrary-sleep
+            if time.monotonic() >= next_reload:
+                reload_inventory()
+                next_reload = time.monotonic() + CHECK_INTERVAL
+            
+            due_servers = scheduler.pop_due()
+            if due_servers:
+                with CYCLE_SECONDS.time():
+                    monitor_servers(due_servers)
+            
+            wait_seconds = min(scheduler.seconds_until_next(), next_reload - time.monotonic())
+            time.sleep(max(wait_seconds, 1))  # nosemgrep: arbitrary-sleep
             
     except KeyboardInterrupt:
         logging.info("Monitoring stopped by user")
     except Exception as e:
         logging.error(f"Monitoring error: {e}")
+    finally:
+        if shard_coordinator:
+            shard_coordinator.release()
+        ssh_probe_pool.close()
+        ssh_key_manager.close()
+        servicenow_client.close()
+        incident_index.close()
+        log_listener.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
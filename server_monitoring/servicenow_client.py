@@ -0,0 +1,93 @@
+"""Pooled ServiceNow Table API client with cached credentials"""
+import json
+import logging
+import threading
+import time
+import boto3
+import requests
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+class ServiceNowClient:
+    def __init__(self, url: str, credentials_secret: str, region: str = 'us-east-1',
+                 credentials_ttl: int = 3600, max_retries: int = 3, backoff_factor: float = 0.5,
+                 pool_size: int = 10, timeout: int = 30, credentials_retry_after: float = 30):
+        self.url = url
+        self.credentials_secret = credentials_secret
+        self.credentials_ttl = credentials_ttl
+        self.credentials_retry_after = credentials_retry_after
+        self.timeout = timeout
+        self.secrets_client = boto3.client(
+            'secretsmanager', region_name=region,
+            config=Config(retries={'max_attempts': 3, 'mode': 'standard'})
+        )
+        self._lock = threading.Lock()
+        self._auth = None
+        self._fetched_at = 0.0
+        self._failed_at = None
+
+        # Only GET is retried on HTTP errors; incident creation is not idempotent
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        })
+
+    def get_auth(self, refresh: bool = False):
+        """Return cached (username, password), re-reading Secrets Manager on TTL expiry.
+
+        After a failed read, Secrets Manager is not called again for
+        credentials_retry_after seconds, so an outage does not serialize every
+        ServiceNow call behind a failing AWS call.
+        """
+        with self._lock:
+            if not refresh and self._auth and time.monotonic() - self._fetched_at < self.credentials_ttl:
+                return self._auth
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.credentials_retry_after:
+                return self._auth
+            try:
+                response = self.secrets_client.get_secret_value(SecretId=self.credentials_secret)
+                creds = json.loads(response['SecretString'])
+                self._auth = (creds['username'], creds['password'])
+                self._fetched_at = time.monotonic()
+                self._failed_at = None
+            except Exception as e:
+                logging.error(f"Failed to get ServiceNow credentials: {e}")
+                self._failed_at = time.monotonic()
+                if refresh:
+                    self._auth = None
+            return self._auth
+
+    def request(self, method: str, url: str = None, **kwargs) -> requests.Response:
+        """Send a request over the pooled session, refreshing credentials once on 401"""
+        auth = self.get_auth()
+        if not auth:
+            raise RuntimeError("ServiceNow credentials unavailable")
+
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session.request(method, url or self.url, auth=auth, **kwargs)
+        if response.status_code == 401:
+            logging.warning("ServiceNow returned 401, refreshing credentials")
+            auth = self.get_auth(refresh=True)
+            if auth:
+                response = self.session.request(method, url or self.url, auth=auth, **kwargs)
+        return response
+
+    def get(self, params: dict = None, **kwargs) -> requests.Response:
+        return self.request('GET', params=params, **kwargs)
+
+    def post(self, data: dict, **kwargs) -> requests.Response:
+        return self.request('POST', json=data, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,155 @@
+"""Lease-based sharding of the server inventory across monitor workers"""
+import bisect
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import time
+import boto3
+from botocore.config import Config
+
+class LeaseBackend:
+    """Stores worker membership leases shared by all monitor workers"""
+
+    def heartbeat(self, worker_id: str, ttl: int) -> None:
+        raise NotImplementedError
+
+    def live_workers(self) -> list:
+        raise NotImplementedError
+
+    def release(self, worker_id: str) -> None:
+        raise NotImplementedError
+
+class FileLeaseBackend(LeaseBackend):
+    """Lease files in a local directory, serialized with flock (single host / testing)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock_path = os.path.join(directory, '.lock')
+
+    def heartbeat(self, worker_id: str, ttl: int) -> None:
+        with self._locked():
+            path = self._lease_path(worker_id)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'worker_id': worker_id, 'expires_at': time.time() + ttl}, f)
+            os.replace(tmp_path, path)
+
+    def live_workers(self) -> list:
+        now = time.time()
+        workers = []
+        with self._locked():
+            for name in os.listdir(self.directory):
+                if not name.endswith('.lease'):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    with open(path) as f:
+                        lease = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if lease['expires_at'] > now:
+                    workers.append(lease['worker_id'])
+                else:
+                    os.remove(path)
+        return sorted(workers)
+
+    def release(self, worker_id: str) -> None:
+        with self._locked():
+            path = self._lease_path(worker_id)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _lease_path(self, worker_id: str) -> str:
+        return os.path.join(self.directory, f"{worker_id}.lease")
+
+    def _locked(self):
+        return _FileLock(self._lock_path)
+
+class DynamoDBLeaseBackend(LeaseBackend):
+    """Lease items in a DynamoDB table keyed by worker_id (multi-host deployments)"""
+
+    def __init__(self, table_name: str, region: str = 'us-east-1'):
+        config = Config(retries={'max_attempts': 3, 'mode': 'standard'})
+        self.table = boto3.resource('dynamodb', region_name=region, config=config).Table(table_name)
+
+    def heartbeat(self, worker_id: str, ttl: int) -> None:
+        self.table.put_item(Item={'worker_id': worker_id, 'expires_at': int(time.time()) + ttl})
+
+    def live_workers(self) -> list:
+        now = int(time.time())
+        workers = []
+        kwargs = {'ProjectionExpression': 'worker_id, expires_at'}
+        while True:
+            response = self.table.scan(**kwargs)
+            workers.extend(item['worker_id'] for item in response['Items'] if item['expires_at'] > now)
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        return sorted(workers)
+
+    def release(self, worker_id: str) -> None:
+        self.table.delete_item(Key={'worker_id': worker_id})
+
+class ConsistentHashRing:
+    def __init__(self, nodes, replicas: int = 100):
+        self._ring = sorted(
+            (_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    def get_node(self, key: str) -> str:
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+class ShardCoordinator:
+    def __init__(self, backend: LeaseBackend, worker_id: str, lease_ttl: int = 90, replicas: int = 100):
+        self.backend = backend
+        self.worker_id = worker_id
+        self.lease_ttl = lease_ttl
+        self.replicas = replicas
+        self._workers = []
+        self._ring = ConsistentHashRing([worker_id], replicas)
+
+    def refresh(self) -> bool:
+        """Renew this worker's lease and rebuild the ring if membership changed"""
+        self.backend.heartbeat(self.worker_id, self.lease_ttl)
+        workers = self.backend.live_workers()
+        if self.worker_id not in workers:
+            workers = sorted(workers + [self.worker_id])
+        if workers == self._workers:
+            return False
+        logging.info(f"Shard membership changed: {len(workers)} workers {workers}")
+        self._workers = workers
+        self._ring = ConsistentHashRing(workers, self.replicas)
+        return True
+
+    def owns(self, server_name: str) -> bool:
+        return self._ring.get_node(server_name) == self.worker_id
+
+    def filter(self, servers) -> list:
+        return [server for server in servers if self.owns(server['name'])]
+
+    def release(self) -> None:
+        self.backend.release(self.worker_id)
+
+class _FileLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha256(value.encode()).digest()[:8], 'big')
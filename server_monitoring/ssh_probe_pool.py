@@ -0,0 +1,114 @@
+"""In-process SSH probes over persistent paramiko transports"""
+import socket
+import threading
+import paramiko
+
+class SSHProbePool:
+    def __init__(self, key_manager, username: str, timeout: int = 10, port: int = 22):
+        self.key_manager = key_manager
+        self.username = username
+        self.timeout = timeout
+        self.port = port
+        self._lock = threading.Lock()
+        # server name -> (IP the transport was opened to, client)
+        self._clients = {}
+        self._host_locks = {}
+
+    def probe(self, server_name: str, server_ip: str):
+        """Run a no-op command over the host's cached transport, reconnecting once on failure"""
+        with self._host_lock(server_name):
+            cached = self._clients.get(server_name)
+            if cached is not None and cached[0] != server_ip:
+                # The server moved to a new IP; never report the old host's health for it
+                self._drop(server_name)
+                cached = None
+            if cached is not None:
+                client = cached[1]
+                try:
+                    self._exec_check(client)
+                    return True, "Connection successful"
+                except (paramiko.SSHException, socket.error, EOFError):
+                    # Stale transport, fall through to a fresh handshake
+                    self._drop(server_name)
+
+            try:
+                client = self._connect(server_ip)
+                self._exec_check(client)
+            except paramiko.AuthenticationException as e:
+                # Key may have been rotated since the last version check
+                self.key_manager.invalidate()
+                return False, f"SSH authentication failed: {e}"
+            except (socket.timeout, TimeoutError):
+                return False, "SSH connection timeout"
+            except (paramiko.SSHException, socket.error, EOFError) as e:
+                return False, str(e) or "SSH connection failed"
+
+            with self._lock:
+                self._clients[server_name] = (server_ip, client)
+            return True, "Connection successful"
+
+    def prune(self, active_servers: dict) -> None:
+        """Close transports for servers no longer in the inventory or whose IP changed.
+
+        active_servers maps server name -> current IP.
+        """
+        with self._lock:
+            stale = [name for name, (ip, _) in self._clients.items() if active_servers.get(name) != ip]
+            for name in [name for name in self._host_locks if name not in active_servers]:
+                del self._host_locks[name]
+        for server_name in stale:
+            self._drop(server_name)
+
+    def close(self) -> None:
+        with self._lock:
+            clients = [client for _, client in self._clients.values()]
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+    def _connect(self, server_ip: str) -> paramiko.SSHClient:
+        client = paramiko.SSHClient()
+        # Matches StrictHostKeyChecking=no used by the ssh subprocess probe
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # nosec B507
+        try:
+            client.connect(
+                server_ip,
+                port=self.port,
+                username=self.username,
+                key_filename=self.key_manager.get_key_file(),
+                timeout=self.timeout,
+                banner_timeout=self.timeout,
+                auth_timeout=self.timeout,
+                allow_agent=False,
+                look_for_keys=False
+            )
+        except Exception:
+            client.close()
+            raise
+        client.get_transport().set_keepalive(30)
+        return client
+
+    def _exec_check(self, client: paramiko.SSHClient) -> None:
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            raise paramiko.SSHException("Transport is not active")
+        channel = transport.open_session(timeout=self.timeout)
+        try:
+            channel.settimeout(self.timeout)
+            channel.exec_command("true")
+            if not channel.status_event.wait(self.timeout):
+                raise socket.timeout("Remote check command timed out")
+            if channel.exit_status != 0:
+                raise paramiko.SSHException("Remote check command failed")
+        finally:
+            channel.close()
+
+    def _drop(self, server_name: str) -> None:
+        with self._lock:
+            cached = self._clients.pop(server_name, None)
+        if cached is not None:
+            cached[1].close()
+
+    def _host_lock(self, server_name: str) -> threading.Lock:
+        with self._lock:
+            return self._host_locks.setdefault(server_name, threading.Lock())
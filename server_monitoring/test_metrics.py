@@ -0,0 +1,32 @@
+"""Tests for the boto3 client instrumentation in metrics.py"""
+import pytest
+
+botocore_session = pytest.importorskip('botocore.session')
+from botocore.config import Config
+from botocore.exceptions import EndpointConnectionError
+
+from metrics import Registry, instrument_boto3_client
+
+def test_connection_error_is_counted():
+    registry = Registry()
+    latency = registry.histogram('aws_request_seconds', 'AWS API latency')
+    errors = registry.counter('aws_errors_total', 'AWS API errors')
+
+    # Nothing listens on port 1, so the request fails before any HTTP response
+    client = botocore_session.get_session().create_client(
+        'ec2',
+        region_name='us-east-1',
+        endpoint_url='http://127.0.0.1:1',
+        aws_access_key_id='testing',
+        aws_secret_access_key='testing',
+        config=Config(retries={'total_max_attempts': 1}, connect_timeout=1)
+    )
+    instrument_boto3_client(client, latency, errors, service='ec2')
+
+    with pytest.raises(EndpointConnectionError):
+        client.describe_instances()
+
+    rendered = registry.render()
+    assert ('aws_errors_total{operation="DescribeInstances",reason="EndpointConnectionError",service="ec2"} 1'
+            in rendered)
+    assert 'aws_request_seconds_count{operation="DescribeInstances",service="ec2"} 1' in rendered
@@ -3,11 +3,13 @@
         var shortDesc = current.short_description.toString();
         var serverName = '';
         var serverIP = '';
+        var instanceId = '';
         
         // Extract server name from description
         var match = shortDesc.match(/SSH Connection Failure:\s*(.+)/);
         if (match && match[1]) serverName = match[1].trim();
         if (current.u_server_ip) serverIP = current.u_server_ip.toString();
+        if (current.u_instance_id) instanceId = current.u_instance_id.toString();
         
         // Build payload
         var payload = {
@@ -16,7 +18,8 @@
             priority: current.priority.toString(),
             reported_by: current.sys_created_by.toString(),
             server_name: serverName,
-            server_ip: serverIP
+            server_ip: serverIP,
+            instance_id: instanceId
         };
         
         // API Gateway endpoint